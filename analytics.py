@@ -0,0 +1,164 @@
+"""Session analytics events: non-blocking logging, batched compressed writes, offline aggregation.
+
+log() only does a put_nowait onto a bounded in-process queue, so it never
+adds I/O latency to a Streamlit rerun (events are dropped and counted if the
+writer falls behind). A daemon writer thread drains the queue in batches and
+appends each batch as one gzip member to an append-only JSON-lines file.
+Files are per-process (replicas never interleave writes) and rotate by size
+and by UTC day; a crash can at most truncate the last member.
+
+Aggregate:  python analytics.py aggregate --dir analytics_events
+"""
+import argparse
+import atexit
+import datetime
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+
+
+class EventLogger:
+    def __init__(self, directory: str, batch_size: int = 500, flush_interval: float = 2.0,
+                 max_file_bytes: int = 16 * 1024 * 1024, max_queue: int = 50_000):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._path = None
+        self._path_day = None
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="analytics-writer")
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, event: str, session_id: str = None, **props):
+        """Enqueue one event; never blocks."""
+        try:
+            self._queue.put_nowait({"ts": time.time(), "event": event, "session": session_id, **props})
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch, stop = [], False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._write(batch)
+                except OSError:
+                    self.dropped += len(batch)  # disk trouble must not kill the writer
+            if stop:
+                return
+
+    def _current_path(self) -> str:
+        today = datetime.datetime.utcnow().strftime("%Y%m%d")
+        if (self._path is None or self._path_day != today
+                or (os.path.exists(self._path) and os.path.getsize(self._path) >= self.max_file_bytes)):
+            stamp = datetime.datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+            self._path = os.path.join(self.directory, f"events-{stamp}-{os.getpid()}.jsonl.gz")
+            self._path_day = today
+        return self._path
+
+    def _write(self, batch):
+        payload = "".join(json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in batch)
+        # One complete gzip member per batch; gzip readers decode concatenated members transparently
+        with open(self._current_path(), "ab") as f:
+            f.write(gzip.compress(payload.encode("utf-8")))
+        self.written += len(batch)
+
+    def close(self, timeout: float = 5.0):
+        """Flush what is queued and stop the writer (registered with atexit)."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+
+class NullEventLogger:
+    """Drops every event; stands in when the events directory can't be created."""
+    dropped = 0
+    written = 0
+
+    def log(self, event: str, session_id: str = None, **props):
+        pass
+
+    def close(self, timeout: float = 5.0):
+        pass
+
+
+def open_logger(directory: str, **kwargs):
+    """EventLogger for `directory`, or a NullEventLogger if it isn't writable."""
+    try:
+        return EventLogger(directory, **kwargs)
+    except OSError:
+        return NullEventLogger()  # read-only filesystem etc.: serve the page without analytics
+
+
+def iter_events(directory: str):
+    """Yield every event from the files in `directory`, oldest file first."""
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl.gz"):
+            continue
+        try:
+            with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except (EOFError, OSError, zlib.error):
+            continue  # truncated last member (crash mid-write): keep what was readable
+
+
+def aggregate(directory: str) -> dict:
+    """Single pass over the event files: counts by event/day, sessions, slider and stage usage."""
+    by_event, by_day, sliders, stages = Counter(), Counter(), Counter(), Counter()
+    sessions = defaultdict(Counter)
+    for e in iter_events(directory):
+        by_event[e["event"]] += 1
+        by_day[datetime.datetime.utcfromtimestamp(e["ts"]).strftime("%Y-%m-%d")] += 1
+        if e.get("session"):
+            sessions[e["session"]][e["event"]] += 1
+        if e["event"] == "slider_change":
+            sliders[e.get("param")] += 1
+        elif e["event"] == "stage_view":
+            stages[e.get("stage")] += 1
+    n_sessions = len(sessions)
+    return {
+        "events": dict(by_event),
+        "events_by_day": dict(sorted(by_day.items())),
+        "sessions": n_sessions,
+        "events_per_session": round(sum(by_event.values()) / n_sessions, 2) if n_sessions else 0,
+        "sessions_with_autoplay": sum(1 for c in sessions.values() if c["autoplay"]),
+        "sessions_with_download": sum(1 for c in sessions.values() if c["bundle_download"]),
+        "slider_changes": dict(sliders),
+        "stage_views": dict(sorted(stages.items(), key=lambda kv: str(kv[0]))),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session analytics tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("aggregate")
+    a.add_argument("--dir", default=os.environ.get("SUSTAINAPOWER_ANALYTICS_DIR", "analytics_events"))
+    args = parser.parse_args()
+    print(json.dumps(aggregate(args.dir), indent=2))
@@ -0,0 +1,425 @@
+"""Local JSON API for the plant economics, for tools that can't drive the Streamlit UI.
+
+    POST /v1/performance   {"feed_rate": 1000, "moisture": 20, ...}        -> {"result": {...}}
+                           {"items": [{...}, {...}]}                       -> {"results": [...]}
+    POST /v1/sankey        same bodies; Sankey labels/sources/targets/values per item
+    GET  /v1/stats         request/latency/batch counters and cache stats
+    GET  /v1/health
+    GET  /v1/exports/NAME  download a bulk export written by the app (export.EXPORT_DIR),
+                           streamed from disk as an attachment
+
+Inputs per item: feed_rate, moisture (required); cge=0.75, co2_capture=90,
+temperature=850, unit_multiplier=1 (24 for daily values), as in the sidebar.
+Values must be finite and physically meaningful (see LIMITS); anything else
+is a 400, and an unexpected failure is a 500, both with an "error" message.
+Every response carries its server-side latency ("latency_ms" and an
+X-Latency-Ms header).
+
+Requests are not evaluated one by one: every item goes onto a queue that a
+micro-batcher drains (up to --max-batch items, waiting at most --max-wait-ms
+for more), so concurrent clients share one vectorized evaluation (surrogate
+tables where valid, exact model elsewhere; see surrogate.performance_batch).
+Results are read from and written to the same cache entries as the UI's
+calculate_performance, so either side warms the other.
+
+    python api.py serve --port 8765
+    python api.py bench --url http://127.0.0.1:8765 --concurrency 64 --requests 20000
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import time
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+
+import cache
+import export
+import surrogate
+from plant_model import PRICES, sankey_flows
+
+logger = logging.getLogger("sustainapower.api")
+
+SURROGATE_DIR = os.environ.get("SUSTAINAPOWER_SURROGATE_DIR", "surrogate_tables")
+
+# Item fields and their defaults (None = required)
+FIELDS = {"feed_rate": None, "moisture": None, "cge": 0.75, "co2_capture": 90, "temperature": 850, "unit_multiplier": 1}
+
+# Accepted range per field: (low, high, low inclusive). Results are written to the UI's cache, so
+# nothing the model can't meaningfully evaluate (NaN, negative feed, zero unit multiplier) gets in.
+LIMITS = {
+    "feed_rate": (0.0, math.inf, True), "moisture": (0.0, 100.0, True), "cge": (0.0, 1.0, False),
+    "co2_capture": (0.0, 100.0, True), "temperature": (0.0, math.inf, False), "unit_multiplier": (0.0, math.inf, False),
+}
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_ITEMS = 100_000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+ExportFile = collections.namedtuple("ExportFile", "path name fmt")
+
+
+def _number(name: str, v):
+    # Integral values as int, so keys match the UI's slider values (1000, not 1000.0)
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        raise BadRequest(f"{name}: expected a number, got {v!r}")
+    if not math.isfinite(v):
+        raise BadRequest(f"{name}: expected a finite number, got {v!r}")
+    low, high, low_inclusive = LIMITS[name]
+    if not (low <= v if low_inclusive else low < v) or v > high:
+        op = ">=" if low_inclusive else ">"
+        bound = f"{op} {low:g}" if math.isinf(high) else f"{op} {low:g} and <= {high:g}"
+        raise BadRequest(f"{name} must be {bound}, got {v!r}")
+    return int(v) if float(v).is_integer() else float(v)
+
+
+def parse_item(obj) -> dict:
+    if not isinstance(obj, dict):
+        raise BadRequest("each item must be a JSON object")
+    item = {}
+    for name, default in FIELDS.items():
+        if name in obj:
+            item[name] = _number(name, obj[name])
+        elif default is None:
+            raise BadRequest(f"missing field {name!r}")
+        else:
+            item[name] = default
+    return item
+
+
+class MicroBatcher:
+    """Coalesces queued jobs (lists of items) into one cache pass plus one vectorized evaluation."""
+
+    def __init__(self, table, max_batch: int = 1024, max_wait: float = 0.001):
+        self.table = table
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.memory = cache.MemoryCache(max_entries=65_536, max_bytes=64 * 1024 * 1024)
+        self.backend = cache.get_backend()
+        self.batches = 0
+        self.items = 0
+        self.computed = 0
+        self._queue = asyncio.Queue()
+        # One worker: evaluation is vectorized, the point is keeping it off the event loop
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="api-eval")
+        self._writer = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="api-cache-write")
+
+    async def submit(self, items: list) -> list:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((items, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self._queue.get()]
+            size = len(jobs[0][0])
+            if size < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)  # let concurrent requests join this batch
+            while size < self.max_batch and not self._queue.empty():
+                job = self._queue.get_nowait()
+                jobs.append(job)
+                size += len(job[0])
+            items = [item for job_items, _ in jobs for item in job_items]
+            try:
+                results = await loop.run_in_executor(self._executor, self._evaluate, items)
+            except Exception:
+                results = None
+            if results is None:
+                # Re-run the jobs one by one so a failure only reaches the request that caused it
+                for job_items, future in jobs:
+                    try:
+                        result = await loop.run_in_executor(self._executor, self._evaluate, job_items)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            start = 0
+            for job_items, future in jobs:
+                if not future.done():  # client may have gone away
+                    future.set_result(results[start:start + len(job_items)])
+                start += len(job_items)
+
+    def _evaluate(self, items: list) -> list:
+        # Same entries as streamlit_app.calculate_performance, so the app and the API warm each other
+        keys = [cache.performance_key(item["feed_rate"], item["moisture"], item["cge"], item["co2_capture"],
+                                      item["unit_multiplier"], PRICES, item["temperature"]) for item in items]
+        results = [None] * len(items)
+        missing = []
+        for i, key in enumerate(keys):
+            value = self.memory.get(key)
+            if value is None:
+                try:
+                    data = self.backend.get_bytes(key)
+                except OSError:
+                    data = None
+                if data is not None:
+                    value = json.loads(data)
+                    self.memory.set(key, value, len(data))
+            if value is None:
+                missing.append(i)
+            else:
+                results[i] = value
+        if missing:
+            cols = {name: np.array([items[i][name] for i in missing], dtype=np.float64) for name in FIELDS}
+            perf = surrogate.performance_batch(self.table, cols["feed_rate"], cols["moisture"], cols["temperature"],
+                                               cols["cge"], cols["co2_capture"], cols["unit_multiplier"], PRICES)
+            perf = {k: v.tolist() for k, v in perf.items()}
+            writes = []
+            for j, i in enumerate(missing):
+                value = {k: v[j] for k, v in perf.items()}
+                data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+                self.memory.set(keys[i], value, len(data))
+                writes.append((keys[i], data))
+                results[i] = value
+            self.computed += len(missing)
+            self._writer.submit(self._write_back, writes)
+        return results
+
+    def _write_back(self, writes):
+        for key, data in writes:
+            try:
+                self.backend.set_bytes(key, data)
+            except OSError:
+                return  # disk full etc.: results were served, just not shared
+
+
+class LatencyStats:
+    def __init__(self, window: int = 10_000):
+        self.requests = collections.Counter()
+        self.errors = 0
+        self._latencies = collections.deque(maxlen=window)
+
+    def record(self, path: str, seconds: float):
+        self.requests[path] += 1
+        self._latencies.append(seconds * 1000)
+
+    def as_dict(self) -> dict:
+        lat = np.array(self._latencies) if self._latencies else np.zeros(1)
+        return {
+            "requests": dict(self.requests), "errors": self.errors,
+            "latency_percentiles_ms": {f"p{q}": round(float(np.percentile(lat, q)), 3) for q in (50, 95, 99)},
+        }
+
+
+class APIServer:
+    def __init__(self, table=None, max_batch: int = 1024, max_wait: float = 0.001):
+        self.table = table
+        self.batcher_args = (max_batch, max_wait)
+        self.batcher = None
+        self.stats = LatencyStats()
+        self.started = time.time()
+
+    async def serve(self, host: str, port: int):
+        self.batcher = MicroBatcher(self.table, *self.batcher_args)
+        batch_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self._handle, host, port, limit=MAX_BODY_BYTES)
+        print(f"[api] listening on http://{host}:{port} (surrogate table: {'yes' if self.table else 'no'})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                t0 = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    method, target, version = "", "", "HTTP/1.0"
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if not method:
+                    status, payload = 400, {"error": "malformed request line"}
+                elif length < 0:
+                    status, payload = 400, {"error": f"invalid Content-Length {headers['content-length']!r}"}
+                elif length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "request body too large"}
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self._route(method, urlsplit(target).path, body)
+                    except Exception as e:
+                        logger.exception("%s %s failed", method, target)
+                        status, payload = 500, {"error": f"internal error: {type(e).__name__}: {e}"}
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version.upper() == "HTTP/1.1" else connection == "keep-alive"
+                # An unread or unframed body leaves the stream out of sync: answer, then close
+                keep_alive = keep_alive and bool(method) and 0 <= length <= MAX_BODY_BYTES
+                file = None
+                if isinstance(payload, ExportFile):
+                    try:
+                        file = open(payload.path, "rb")
+                    except OSError:  # purged since the route looked it up
+                        status, payload = 404, {"error": f"no export named {payload.name!r}"}
+                latency_ms = (time.perf_counter() - t0) * 1000
+                if file is None:
+                    payload["latency_ms"] = round(latency_ms, 3)
+                    try:
+                        data = json.dumps(payload, separators=(",", ":"), allow_nan=False).encode("utf-8")
+                    except ValueError:  # a non-finite result: never send invalid JSON
+                        status = 500
+                        data = json.dumps({"error": "internal error: result is not finite",
+                                           "latency_ms": payload["latency_ms"]}).encode("utf-8")
+                self.stats.record(urlsplit(target).path, latency_ms / 1000)
+                if status >= 400:
+                    self.stats.errors += 1
+                head = (f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\nX-Latency-Ms: {latency_ms:.3f}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+                if file is not None:
+                    with file:
+                        await self._send_file(writer, head, payload, file)
+                else:
+                    writer.write(f"{head}Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n"
+                                 .encode("latin-1") + data)
+                    await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            return
+        finally:
+            writer.close()
+
+    async def _send_file(self, writer, head: str, f: ExportFile, fh):
+        # Exports can be several GB: hand the file to the kernel (or copy it in chunks) instead of reading it
+        size = os.fstat(fh.fileno()).st_size
+        writer.write(f"{head}Content-Type: {export.FORMATS[f.fmt][1]}\r\nContent-Length: {size}\r\n"
+                     f"Content-Disposition: attachment; filename=\"{f.name}\"\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        await asyncio.get_running_loop().sendfile(writer.transport, fh)
+
+    async def _route(self, method: str, path: str, body: bytes):
+        if method == "GET" and path == "/v1/health":
+            return 200, {"status": "ok", "uptime_s": round(time.time() - self.started, 1)}
+        if method == "GET" and path == "/v1/stats":
+            b = self.batcher
+            return 200, {
+                **self.stats.as_dict(),
+                "batches": b.batches, "items": b.items, "computed": b.computed,
+                "mean_batch_size": round(b.items / b.batches, 2) if b.batches else None,
+                "cache": [{"cache": "api", "tier": "memory", **b.memory.info()}] + cache.stats(),
+            }
+        if path.startswith("/v1/exports/"):
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            name = unquote(path[len("/v1/exports/"):])
+            found = export.find_export(name)
+            if found is None:
+                return 404, {"error": f"no export named {name!r}"}
+            return 200, ExportFile(found[0], name, found[1])
+        if path not in ("/v1/performance", "/v1/sankey"):
+            return 404, {"error": f"no route for {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            request = json.loads(body or b"null")
+            single = not (isinstance(request, dict) and "items" in request)
+            raw = [request] if single else request["items"]
+            if not isinstance(raw, list) or not raw:
+                raise BadRequest("'items' must be a non-empty list")
+            if len(raw) > MAX_ITEMS:
+                raise BadRequest(f"at most {MAX_ITEMS} items per request")
+            items = [parse_item(obj) for obj in raw]
+        except ValueError as e:  # includes BadRequest and JSON decode errors
+            return 400, {"error": str(e)}
+
+        results = await self.batcher.submit(items)
+        if path == "/v1/sankey":
+            results = [sankey_flows(perf, item["feed_rate"], item["moisture"], item["unit_multiplier"])
+                       for perf, item in zip(results, items)]
+        return 200, ({"result": results[0]} if single else {"results": results})
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+
+async def _bench(url: str, concurrency: int, requests: int, batch: int):
+    """Load generator: `concurrency` keep-alive connections posting random items."""
+    parts = urlsplit(url)
+    rng = np.random.default_rng()
+    per_conn = requests // concurrency
+    latencies = []
+
+    def body():
+        items = [{"feed_rate": round(float(x), 1), "moisture": round(float(y), 1), "cge": round(float(z), 3)}
+                 for x, y, z in zip(rng.uniform(500, 5000, batch), rng.uniform(5, 50, batch), rng.uniform(0.4, 0.9, batch))]
+        return json.dumps(items[0] if batch == 1 else {"items": items}).encode("utf-8")
+
+    async def worker():
+        bodies = [body() for _ in range(per_conn)]  # built up front so the client measures the server
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+        for body_bytes in bodies:
+            t0 = time.perf_counter()
+            writer.write(f"POST /v1/performance HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(body_bytes)}\r\n\r\n".encode() + body_bytes)
+            await writer.drain()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies)
+    print(json.dumps({
+        "requests": len(lat), "evaluations": len(lat) * batch, "seconds": round(elapsed, 2),
+        "requests_per_s": round(len(lat) / elapsed), "evaluations_per_s": round(len(lat) * batch / elapsed),
+        "client_latency_ms": {f"p{q}": round(float(np.percentile(lat, q)), 2) for q in (50, 95, 99)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched JSON API for the performance model")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--max-batch", type=int, default=1024)
+    s.add_argument("--max-wait-ms", type=float, default=1.0)
+    b = sub.add_parser("bench", help="load-test a running server")
+    b.add_argument("--url", default="http://127.0.0.1:8765")
+    b.add_argument("--concurrency", type=int, default=64)
+    b.add_argument("--requests", type=int, default=20_000)
+    b.add_argument("--batch", type=int, default=1, help="items per request")
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        server = APIServer(surrogate.open_table(SURROGATE_DIR), args.max_batch, args.max_wait_ms / 1000)
+        asyncio.run(server.serve(args.host, args.port))
+    else:
+        asyncio.run(_bench(args.url, args.concurrency, args.requests, args.batch))
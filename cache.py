@@ -0,0 +1,380 @@
+"""Pluggable result cache shared by all app replicas on a node.
+
+Keys are content hashes of (namespace, MODEL_VERSION, call arguments), so any
+change to PRICES (passed as an argument) or to the model version produces new
+keys instead of stale hits. The default backend is DiskCache: one file per
+entry, written atomically (temp file + os.replace) so concurrent readers in
+other processes never see partial values, and evicted oldest-first once the
+directory exceeds its byte budget. The budget counts the disk space files
+actually take (whole filesystem blocks), not their content length, and the
+directory walks that size and evict it run on a background thread. A warm
+cache survives restarts.
+
+Each memoized function also gets a per-process MemoryCache in front of the
+shared backend, bounded by entry count and bytes, with LRU eviction and an
+optional TTL. Every cache keeps live counters (hits, misses, evictions,
+resident bytes) that stats() reports for the admin panel.
+
+Backend selection (environment):
+    SUSTAINAPOWER_CACHE_BACKEND  "disk" (default) or "none"
+    SUSTAINAPOWER_CACHE_DIR      cache directory (default: <tmp>/sustainapower-cache)
+    SUSTAINAPOWER_CACHE_MAX_MB   byte budget for the directory (default: 256)
+"""
+import collections
+import functools
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from plant_model import MODEL_VERSION
+
+_MISS = object()
+_HEADER = struct.Struct("<d")  # DiskCache entry header: write time (epoch seconds)
+
+
+def make_key(namespace: str, *args, **kwargs) -> str:
+    payload = json.dumps([namespace, MODEL_VERSION, args, kwargs], sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def performance_key(feed_rate, moisture, cge, co2_capture, unit_multiplier, prices, temperature=850) -> str:
+    """Key of one plant-performance result, shared by the app's calculate_performance and the API."""
+    return make_key("calculate_performance", feed_rate, moisture, cge, co2_capture, unit_multiplier, prices, temperature)
+
+
+class CacheStats:
+    """Live counters for one cache. Increments are not locked; the numbers are for sizing, not billing."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions, "expirations": self.expirations,
+        }
+
+
+class CacheBackend:
+    """Interface for cache backends. Values are raw bytes; get_json/set_json layer JSON on top."""
+
+    def get_bytes(self, key: str, max_age: float = None):
+        raise NotImplementedError
+
+    def set_bytes(self, key: str, data: bytes):
+        raise NotImplementedError
+
+    def clear(self):
+        pass
+
+    def info(self) -> dict:
+        return {}
+
+    def get_json(self, key: str, default=None, max_age: float = None):
+        data = self.get_bytes(key, max_age=max_age)
+        return default if data is None else json.loads(data)
+
+    def set_json(self, key: str, value):
+        self.set_bytes(key, json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache with entry/byte budgets and an optional TTL.
+
+    Stores decoded values; `size` is the caller's estimate of an entry's bytes
+    (the length of its serialized form).
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024, ttl: float = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.resident_bytes = 0
+        self._entries = collections.OrderedDict()  # key -> (value, size, stored_at)
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default
+            if self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value, size: int):
+        if size > self.max_bytes:
+            return  # would evict everything else; not worth keeping in memory
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self.resident_bytes += size
+            while len(self._entries) > self.max_entries or self.resident_bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.resident_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def info(self) -> dict:
+        return {
+            **self.stats.as_dict(), "entries": len(self._entries), "resident_bytes": self.resident_bytes,
+            "max_entries": self.max_entries, "max_bytes": self.max_bytes, "ttl_s": self.ttl,
+        }
+
+
+class NullCache(CacheBackend):
+    """Caches nothing; every lookup is a miss."""
+
+    def get_bytes(self, key, max_age=None):
+        return None
+
+    def set_bytes(self, key, data):
+        pass
+
+
+class DiskCache(CacheBackend):
+    """File-per-entry cache directory, safe to share between processes.
+
+    Hits refresh the entry's mtime, so eviction (oldest mtime first) approximates LRU.
+    Each file starts with its write time, which is what max_age is checked against.
+    The initial size scan and evictions run on a maintenance thread; until the scan
+    finishes, resident_bytes only counts this process's writes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, background: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.background = background
+        self.stats = CacheStats()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            self._block = os.statvfs(directory).f_frsize or 4096
+        except (AttributeError, OSError):
+            self._block = 4096  # no statvfs (Windows)
+        self._approx_bytes = 0
+        self._maintenance = threading.Lock()
+        self._run_maintenance(self._refresh)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _disk_size(self, st) -> int:
+        # Every entry occupies whole blocks: a 200-byte result costs 4 KiB of disk
+        blocks = getattr(st, "st_blocks", None)
+        if blocks is not None:
+            return blocks * 512
+        return -(-st.st_size // self._block) * self._block
+
+    def _run_maintenance(self, task):
+        # A full walk + stat costs ~1 s per 100k entries: never on a caller's (rerun) thread.
+        # At most one walk at a time per process; a request while one is running is dropped.
+        if not self._maintenance.acquire(blocking=False):
+            return
+        def run():
+            try:
+                task()
+            except OSError:
+                pass  # directory removed or unreadable; the next write retries
+            finally:
+                self._maintenance.release()
+        if self.background:
+            threading.Thread(target=run, name="disk-cache-maintenance", daemon=True).start()
+        else:
+            run()
+
+    def _refresh(self):
+        total = self._scan()[1]
+        self._approx_bytes = total
+        if total > self.max_bytes:
+            self.evict()
+
+    def _scan(self):
+        entries, total = [], 0
+        for root, _, names in os.walk(self.directory):
+            try:
+                total += self._disk_size(os.stat(root))  # directory blocks grow with the entry count
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue  # evicted by another process mid-scan
+                size = self._disk_size(st)
+                entries.append((st.st_mtime, size, path))
+                total += size
+        return entries, total
+
+    def get_bytes(self, key, max_age=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            (written_at,) = _HEADER.unpack_from(data)
+            if max_age is not None and time.time() - written_at > max_age:
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            os.utime(path)
+        except (FileNotFoundError, struct.error):
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return data[_HEADER.size:]
+
+    def set_bytes(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(time.time()))
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        self._approx_bytes += -(-(_HEADER.size + len(data)) // self._block) * self._block
+        if self._approx_bytes > self.max_bytes:
+            self._run_maintenance(self.evict)
+
+    def evict(self, target_fraction: float = 0.9):
+        """Delete least recently used entries until the directory is under target_fraction of the budget."""
+        entries, total = self._scan()
+        entries.sort()
+        target = self.max_bytes * target_fraction
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                self.stats.evictions += 1
+            except FileNotFoundError:
+                pass  # another replica evicted it first
+            total -= size
+        self._approx_bytes = total
+
+    def clear(self):
+        for _, _, path in self._scan()[0]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._approx_bytes = 0
+
+    def info(self) -> dict:
+        # Counters are this process's view; resident bytes cover the whole shared directory
+        return {**self.stats.as_dict(), "resident_bytes": self._approx_bytes, "max_bytes": self.max_bytes,
+                "directory": self.directory}
+
+
+_backend = None
+
+
+def get_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        kind = os.environ.get("SUSTAINAPOWER_CACHE_BACKEND", "disk")
+        if kind == "none":
+            _backend = NullCache()
+        else:
+            directory = os.environ.get("SUSTAINAPOWER_CACHE_DIR",
+                                       os.path.join(tempfile.gettempdir(), "sustainapower-cache"))
+            max_mb = float(os.environ.get("SUSTAINAPOWER_CACHE_MAX_MB", "256"))
+            try:
+                _backend = DiskCache(directory, int(max_mb * 1024 * 1024))
+            except OSError:
+                _backend = NullCache()  # read-only filesystem etc.: run uncached rather than fail
+    return _backend
+
+
+def set_backend(backend: CacheBackend):
+    global _backend
+    _backend = backend
+
+
+_memory_caches = {}  # namespace -> MemoryCache, for stats()
+
+
+def memoize(namespace: str, max_age: float = None, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024,
+            key=None):
+    """Cache a function's JSON-serializable result, keyed by its arguments.
+
+    Lookups go to a bounded per-process MemoryCache first (LRU, TTL = max_age),
+    then to the shared backend. `key(*args, **kwargs)` replaces the default
+    make_key(namespace, *args, **kwargs) when other code must find the same entries.
+    """
+    # Streamlit re-executes decorators on every rerun; keep the existing cache for the namespace
+    memory = _memory_caches.get(namespace)
+    if memory is None:
+        memory = _memory_caches[namespace] = MemoryCache(max_entries, max_bytes, ttl=max_age)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            entry = key(*args, **kwargs) if key is not None else make_key(namespace, *args, **kwargs)
+            value = memory.get(entry, _MISS)
+            if value is not _MISS:
+                return value
+            backend = get_backend()
+            try:
+                data = backend.get_bytes(entry, max_age=max_age)
+                if data is not None:
+                    value = json.loads(data)
+                    memory.set(entry, value, len(data))
+                    return value
+            except (OSError, ValueError):
+                pass  # unreadable/corrupt entry: recompute and overwrite
+            value = func(*args, **kwargs)
+            data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+            memory.set(entry, value, len(data))
+            try:
+                backend.set_bytes(entry, data)
+            except OSError:
+                pass  # disk full etc.: the result is still valid, just not shared
+            return value
+        return wrapper
+    return decorator
+
+
+def stats() -> list:
+    """One row of counters per cache: each memoized namespace plus the shared backend."""
+    rows = [{"cache": name, "tier": "memory", **mem.info()} for name, mem in _memory_caches.items()]
+    rows.append({"cache": type(get_backend()).__name__, "tier": "shared", **get_backend().info()})
+    return rows
+
+
+def clear_all():
+    for mem in _memory_caches.values():
+        mem.clear()
+    get_backend().clear()
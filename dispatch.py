@@ -0,0 +1,177 @@
+"""Hourly H₂ storage and dispatch scheduling against a price curve.
+
+Each hour the plant produces p_t kg of H₂ and can sell it at price c_t,
+compress some of it into storage (up to charge_kg_h and the hour's
+production, at compression_cost $/kg), or sell stored H₂ (up to
+discharge_kg_h). schedule() finds the revenue-maximising plan for a whole
+year and compares it with the instant-sale assumption the dashboard uses
+(every kg sold in the hour it is made). H₂ already in storage at the start
+(initial_kg) is part of that baseline too, drained at the discharge limit
+from hour 0, so selling existing stock never shows up as uplift.
+
+Solver: backward dynamic programming on the marginal value of stored H₂.
+The value-to-go is concave in the storage level, so each hour's optimal
+policy is two thresholds: charge up to u_t while a stored kg is worth more
+than c_t + compression_cost, discharge down to w_t while it is worth less
+than c_t. The slope update is a handful of array operations over
+(plants × storage cells), so a fleet is scheduled together. The forward pass
+applies the thresholds to the continuous storage level; only the value
+function is discretised (`levels` cells).
+
+    python dispatch.py schedule --storage 2000 --out schedule.csv
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from plant_model import PRICES, compute_performance
+
+HOURS_PER_YEAR = 8760
+
+# Stands in for ±inf beyond empty/full storage ($/kg); finite so fractional shifts stay finite
+_BIG = 1e9
+
+
+def synthetic_price_curve(base: float = PRICES["h2"], hours: int = HOURS_PER_YEAR, volatility: float = 0.25,
+                          seed: int = 0) -> np.ndarray:
+    """Hourly $/kg curve around `base`: evening peaks, weekend dip, winter premium and AR(1) noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(hours)
+    hour, day = t % 24, t // 24
+    shape = (0.6 * np.sin(2 * np.pi * (hour - 12) / 24) + 0.4 * np.sin(4 * np.pi * (hour - 15) / 24)
+             - 0.3 * (day % 7 >= 5) + 0.3 * np.cos(2 * np.pi * day / 365))
+    noise = np.empty(hours)
+    noise[0] = 0.0
+    shocks = rng.normal(0, 0.3, hours)
+    for i in range(1, hours):
+        noise[i] = 0.9 * noise[i - 1] + shocks[i]
+    return np.maximum(base * (1 + volatility * (shape + noise) / 1.5), 0.0)
+
+
+def schedule(production, prices, storage_kg, charge_kg_h, discharge_kg_h, compression_cost=0.0,
+             initial_kg=0.0, levels: int = 128) -> dict:
+    """Revenue-maximising store/sell schedule.
+
+    production, prices: (hours,) or (plants, hours), kg/h and $/kg; broadcast against each other.
+    storage_kg, charge_kg_h, discharge_kg_h, compression_cost, initial_kg: scalars or (plants,).
+    Returns per-plant arrays: "sold", "charge", "discharge", "level" (plants, hours) and
+    "revenue", "instant_revenue", "uplift", "uplift_pct" (plants,). instant_revenue sells each
+    hour's production in that hour and the initial stock as fast as discharge_kg_h allows.
+    """
+    production, prices = np.broadcast_arrays(np.atleast_2d(np.asarray(production, dtype=np.float64)),
+                                             np.atleast_2d(np.asarray(prices, dtype=np.float64)))
+    n_plants, hours = production.shape
+    per_plant = lambda v: np.broadcast_to(np.asarray(v, dtype=np.float64), (n_plants,))
+    storage, charge_rate, discharge_rate = per_plant(storage_kg), per_plant(charge_kg_h), per_plant(discharge_kg_h)
+    comp_cost, initial = per_plant(compression_cost), np.minimum(per_plant(initial_kg), storage)
+    level = initial.copy()
+
+    # g[:, i] = marginal value ($/kg) of the i-th storage cell at the end of the current hour, kept in
+    # the middle third of a buffer padded with a prohibitive value below empty and above full, so
+    # shifted reads need no bounds checks. windows[p, s] is the contiguous row buf[p, s:s + levels + 1].
+    # float32 halves the memory traffic of the backward pass; cents-level slopes don't need more.
+    cell = np.where(storage > 0, storage / levels, 1.0)
+    buf = np.empty((n_plants, 3 * levels + 1), dtype=np.float32)
+    buf[:, :levels], buf[:, 2 * levels:] = _BIG, -_BIG
+    g = buf[:, levels:2 * levels]
+    g[:] = 0.0  # stock left at the end of the horizon is not valued
+    windows = np.lib.stride_tricks.sliding_window_view(buf, levels + 1, axis=1)
+    rows = np.arange(n_plants)
+    g_up, g_down = np.empty_like(g), np.empty_like(g)
+
+    def shifted(cells, out):
+        # Cell averages of the step function g shifted up by a fractional number of cells (per plant)
+        whole = np.floor(cells)
+        w = windows[rows, levels + whole.astype(np.intp)]
+        frac = (cells - whole).astype(np.float32)[:, None]
+        np.subtract(w[:, 1:], w[:, :-1], out=out)
+        out *= frac
+        out += w[:, :-1]
+        return out
+
+    # Discharging reads g at l - D: a fixed shift per plant
+    down_cells = -np.minimum(discharge_rate / cell, levels)
+    upper = np.empty((n_plants, hours))  # charge up to this level...
+    lower = np.empty((n_plants, hours))  # ...discharge down to this one, else hold
+    sell_all = prices.astype(np.float32)
+    buy_all = (prices + comp_cost[:, None]).astype(np.float32)
+    for t in range(hours - 1, -1, -1):
+        sell, buy = sell_all[:, t:t + 1], buy_all[:, t:t + 1]
+        upper[:, t] = cell * (g > buy).sum(axis=1)
+        lower[:, t] = cell * (g > sell).sum(axis=1)
+        shifted(np.minimum(np.minimum(charge_rate, production[:, t]) / cell, levels - 1), g_up)
+        shifted(down_cells, g_down)
+        # Slope of the value at the start of the hour: follow storage where the policy moves it
+        np.maximum(g, sell, out=g)
+        np.minimum(g, buy, out=g)
+        np.minimum(g, g_down, out=g)
+        np.maximum(g, g_up, out=g)
+
+    sold, charge, discharge, levels_out = (np.empty((n_plants, hours)) for _ in range(4))
+    for t in range(hours):
+        target = np.clip(level, np.minimum(upper[:, t], storage), np.minimum(lower[:, t], storage))
+        delta = np.clip(target - level, -np.minimum(discharge_rate, level),
+                        np.minimum(np.minimum(charge_rate, production[:, t]), storage - level))
+        charge[:, t], discharge[:, t] = np.maximum(delta, 0), np.maximum(-delta, 0)
+        sold[:, t] = production[:, t] - delta
+        level = level + delta
+        levels_out[:, t] = level
+
+    revenue = (sold * prices).sum(axis=1) - comp_cost * charge.sum(axis=1)
+    drain = np.clip(initial[:, None] - discharge_rate[:, None] * np.arange(hours), 0, discharge_rate[:, None])
+    instant = ((production + drain) * prices).sum(axis=1)
+    return {
+        "sold": sold, "charge": charge, "discharge": discharge, "level": levels_out,
+        "revenue": revenue, "instant_revenue": instant, "uplift": revenue - instant,
+        "uplift_pct": np.where(instant != 0, 100 * (revenue - instant) / np.where(instant != 0, instant, 1), 0.0),
+    }
+
+
+def _load_prices(path: str) -> np.ndarray:
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    rows = [r for r in rows if r]
+    if rows:
+        try:
+            float(rows[0][-1])
+        except ValueError:
+            rows = rows[1:]  # header
+    return np.array([float(r[-1]) for r in rows])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="H₂ storage/dispatch scheduler")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("schedule", help="schedule one plant over an hourly price curve")
+    s.add_argument("--prices", help="CSV with hourly $/kg in the last column (default: synthetic year)")
+    s.add_argument("--feed-rate", type=float, default=1000)
+    s.add_argument("--moisture", type=float, default=20)
+    s.add_argument("--cge", type=float, default=0.75)
+    s.add_argument("--storage", type=float, default=2000, help="kg")
+    s.add_argument("--charge", type=float, default=100, help="compressor kg/h")
+    s.add_argument("--discharge", type=float, default=200, help="kg/h")
+    s.add_argument("--compression-cost", type=float, default=0.25, help="$/kg")
+    s.add_argument("--out", help="write the hourly schedule as CSV")
+    args = parser.parse_args()
+
+    curve = _load_prices(args.prices) if args.prices else synthetic_price_curve()
+    h2 = compute_performance(args.feed_rate, args.moisture, args.cge, 90, 1, PRICES)["h2_output"]
+    t0 = time.perf_counter()
+    result = schedule(np.full(len(curve), h2), curve, args.storage, args.charge, args.discharge,
+                      args.compression_cost)
+    summary = {k: round(float(result[k][0]), 2) for k in ("revenue", "instant_revenue", "uplift", "uplift_pct")}
+    summary["solve_s"] = round(time.perf_counter() - t0, 3)
+    print(json.dumps(summary, indent=2), file=sys.stderr if args.out == "-" else sys.stdout)
+    if args.out:
+        f = sys.stdout if args.out == "-" else open(args.out, "w", newline="", encoding="utf-8")
+        writer = csv.writer(f)
+        writer.writerow(["hour", "price", "production", "sold", "charge", "discharge", "level"])
+        for t in range(len(curve)):
+            writer.writerow([t, f"{curve[t]:.4f}", f"{h2:.3f}", *(f"{result[k][0, t]:.3f}"
+                                                                   for k in ("sold", "charge", "discharge", "level"))])
+        if f is not sys.stdout:
+            f.close()
@@ -0,0 +1,162 @@
+"""Streaming export of large result sets (sweeps, Monte Carlo, time series, fleets).
+
+Producers yield *column batches*: dicts mapping column name to an equal-length
+sequence (list or NumPy array). Writers consume the generator one batch at a
+time, so memory is bounded by the batch size rather than the result size:
+
+- iter_csv() yields encoded CSV chunks (optionally gzip-compressed on the fly)
+- write_parquet() appends one compressed row group per batch
+- export_to_file() spools either format to disk for the download path
+- find_export() resolves a download name back to a finished file; api.py
+  streams it from disk with the right Content-Type/Content-Disposition
+
+pyarrow (a Streamlit dependency) is used when present; without it CSV falls
+back to the csv module and Parquet is unavailable.
+"""
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+import time
+import zlib
+
+# pyarrow is imported inside the writers so importing this module stays cheap
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Shared by the app (writes exports) and api.py (serves them)
+EXPORT_DIR = os.environ.get("SUSTAINAPOWER_EXPORT_DIR",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports"))
+
+FORMATS = {
+    # name: (file suffix, mime type)
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def batched(rows, batch_size: int = 50_000):
+    """Group an iterable of row dicts into column batches."""
+    batch = None
+    n = 0
+    for row in rows:
+        if batch is None:
+            batch = {k: [] for k in row}
+        for k, v in row.items():
+            batch[k].append(v)
+        n += 1
+        if n == batch_size:
+            yield batch
+            batch, n = None, 0
+    if batch is not None and n:
+        yield batch
+
+
+def _to_list(col):
+    return col.tolist() if hasattr(col, "tolist") else list(col)
+
+
+def iter_csv(batches, compress: bool = False):
+    """Yield the CSV encoding of a batch stream as bytes chunks (one chunk per batch)."""
+    gz = zlib.compressobj(1, zlib.DEFLATED, 31) if compress else None  # level 1: CSV compresses well even at the fastest level; wbits=31 -> gzip container
+    header_written = False
+    if PARQUET_AVAILABLE:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    for batch in batches:
+        if PARQUET_AVAILABLE:
+            # Arrow's C++ CSV writer is ~10x faster than formatting rows in Python
+            buf = io.BytesIO()
+            pa_csv.write_csv(pa.table(batch), buf, pa_csv.WriteOptions(include_header=not header_written))
+            chunk = buf.getvalue()
+        else:
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\n")
+            if not header_written:
+                writer.writerow(batch.keys())
+            writer.writerows(zip(*(_to_list(c) for c in batch.values())))
+            chunk = buf.getvalue().encode("utf-8")
+        header_written = True
+        if gz is not None:
+            chunk = gz.compress(chunk)
+        if chunk:
+            yield chunk
+    if gz is not None:
+        yield gz.flush()
+
+
+def write_parquet(batches, sink, compression: str = "zstd") -> int:
+    """Write a batch stream to a Parquet file path or binary file object; returns rows written."""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows = 0
+    try:
+        for batch in batches:
+            table = pa.table({k: pa.array(v) for k, v in batch.items()})
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema, compression=compression)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export_to_file(batches, fmt: str = "csv.gz", directory: str = None, prefix: str = "export_") -> str:
+    """Stream batches into a new file in `directory` (default: system temp dir) and return its path.
+
+    The file is written under a temporary name and renamed when complete, so a
+    download handler never serves a half-written export.
+    """
+    suffix, _ = FORMATS[fmt]
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=prefix, suffix=suffix + ".part", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if fmt == "parquet":
+                write_parquet(batches, f)
+            else:
+                for chunk in iter_csv(batches, compress=(fmt == "csv.gz")):
+                    f.write(chunk)
+        path = tmp_path[:-len(".part")]
+        os.replace(tmp_path, path)
+        return path
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def find_export(name: str, directory: str = EXPORT_DIR, prefix: str = "export_"):
+    """Path and format of the finished export called `name` in `directory`, or None.
+
+    Only plain file names written by export_to_file() resolve, so a download
+    route can't be pointed at anything else on disk.
+    """
+    if os.path.basename(name) != name or not name.startswith(prefix):
+        return None
+    fmt = next((f for f, (suffix, _) in FORMATS.items() if name.endswith(suffix)), None)
+    path = os.path.join(directory, name)
+    if fmt is None or not os.path.isfile(path):
+        return None
+    return path, fmt
+
+
+def purge_old_exports(directory: str, max_age_s: float = 3600, prefix: str = "export_"):
+    """Delete finished or abandoned exports older than max_age_s from `directory`."""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age_s
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.startswith(prefix) and os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            pass  # removed concurrently by another replica
@@ -0,0 +1,215 @@
+"""Feedstock library and blend optimizer.
+
+Each feedstock has its own moisture, dry-basis composition and product yields
+(kg per kg dry at 100% cold gas efficiency, the same basis as
+plant_model.DEFAULT_YIELDS). Values are representative literature figures for
+screening, not measured data for a particular supplier.
+
+The blend optimizer picks how many kg/hr of each available feedstock to feed
+so that plant_model's net_revenue is maximal, subject to:
+    supply       0 <= x_i <= available_i
+    capacity     sum(x) <= capacity
+    moisture     wet-mass-weighted blend moisture <= max_moisture
+    ash          dry-mass-weighted blend ash <= max_ash
+The model is linear in the blend and the 20% profit tax is a positive scale
+factor, so maximising pre-tax margin is the same problem and is solved as an
+LP (HiGHS). Many sites are solved as one block-diagonal LP built with NumPy,
+i.e. one solver call however many sites there are.
+
+    python feedstock.py list
+    python feedstock.py optimize sites.csv --out blends.csv
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import sys
+
+from plant_model import DEFAULT_YIELDS, PRICES, compute_performance
+
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+
+# moisture: % wet basis; composition: % of dry mass; yields: kg product per kg dry at CGE = 1
+FEEDSTOCKS = {
+    "msw_organics": {
+        "name": "Municipal organics (mixed)",
+        "moisture": 35.0,
+        "composition": {"cellulose": 40.0, "hemicellulose": 15.0, "lignin": 15.0, "ash": 12.0},
+        "yields": dict(DEFAULT_YIELDS),
+        "default_supply": 800.0,  # kg/hr wet
+    },
+    "wood_chips": {
+        "name": "Forestry wood chips",
+        "moisture": 30.0,
+        "composition": {"cellulose": 42.0, "hemicellulose": 25.0, "lignin": 28.0, "ash": 0.5},
+        "yields": {"h2": 0.13, "meoh": 0.16, "saf": 0.09},
+        "default_supply": 400.0,
+    },
+    "wheat_straw": {
+        "name": "Agricultural residue (straw)",
+        "moisture": 12.0,
+        "composition": {"cellulose": 38.0, "hemicellulose": 29.0, "lignin": 18.0, "ash": 8.0},
+        "yields": {"h2": 0.11, "meoh": 0.14, "saf": 0.07},
+        "default_supply": 300.0,
+    },
+    "kraft_lignin": {
+        "name": "Lignin-rich pulp residue",
+        "moisture": 40.0,
+        "composition": {"cellulose": 2.0, "hemicellulose": 3.0, "lignin": 90.0, "ash": 3.0},
+        "yields": {"h2": 0.10, "meoh": 0.12, "saf": 0.11},
+        "default_supply": 200.0,
+    },
+    "food_waste": {
+        "name": "Source-separated food waste",
+        "moisture": 70.0,
+        "composition": {"cellulose": 15.0, "hemicellulose": 10.0, "lignin": 5.0, "ash": 6.0},
+        "yields": {"h2": 0.14, "meoh": 0.13, "saf": 0.05},
+        "default_supply": 600.0,
+    },
+    "paper_card": {
+        "name": "Paper & cardboard rejects",
+        "moisture": 10.0,
+        "composition": {"cellulose": 60.0, "hemicellulose": 12.0, "lignin": 12.0, "ash": 10.0},
+        "yields": {"h2": 0.12, "meoh": 0.16, "saf": 0.07},
+        "default_supply": 250.0,
+    },
+}
+
+# Gasifier limits used when a site does not set its own
+DEFAULT_MAX_MOISTURE = 50.0  # % wet basis (upper end of the model's moisture range)
+DEFAULT_MAX_ASH = 10.0       # % dry basis (slagging/fouling limit)
+
+
+def _arrays(keys):
+    import numpy as np
+    moisture = np.array([FEEDSTOCKS[k]["moisture"] for k in keys])
+    ash = np.array([FEEDSTOCKS[k]["composition"]["ash"] for k in keys])
+    yields = {p: np.array([FEEDSTOCKS[k]["yields"][p] for k in keys]) for p in DEFAULT_YIELDS}
+    return moisture, ash, yields
+
+
+def margin_per_kg(keys, cge, co2_capture, prices):
+    """Pre-tax net revenue per kg wet feed, shape (n_sites, n_feedstocks); cge/co2_capture broadcast per site."""
+    import numpy as np
+    moisture, _, y = _arrays(keys)
+    cge = np.asarray(cge, dtype=np.float64).reshape(-1, 1)
+    co2_capture = np.asarray(co2_capture, dtype=np.float64).reshape(-1, 1)
+    # Same terms as compute_performance, per kg dry
+    revenue = cge * (y["h2"] * (prices["h2"] + 8.8 * co2_capture / 100 * prices["co2"] / 1000)
+                     + y["meoh"] * prices["meoh"] + y["saf"] * prices["saf"])
+    return (1 - moisture / 100) * (revenue - prices["opex_per_kg_dry"])
+
+
+def optimize_blends(available, capacity, max_moisture=DEFAULT_MAX_MOISTURE, max_ash=DEFAULT_MAX_ASH,
+                    cge=0.75, co2_capture=90, prices=PRICES, keys=None):
+    """Optimal blends for many sites in one LP solve.
+
+    available: (n_sites, n_feedstocks) kg/hr wet, columns in `keys` order (default: all of FEEDSTOCKS).
+    capacity, max_moisture, max_ash, cge, co2_capture: scalars or (n_sites,) arrays.
+    Returns {"keys", "feed" (n_sites, n_feedstocks) kg/hr, "margin" (n_sites,) pre-tax $/hr}.
+    """
+    if not SCIPY_AVAILABLE:
+        raise RuntimeError("The blend optimizer requires scipy (pip install scipy)")
+    import numpy as np
+    from scipy import sparse
+    from scipy.optimize import linprog
+
+    keys = list(keys or FEEDSTOCKS)
+    available = np.atleast_2d(np.asarray(available, dtype=np.float64))
+    n, k = available.shape
+    capacity, max_moisture, max_ash = (np.broadcast_to(np.asarray(v, dtype=np.float64), (n,))
+                                       for v in (capacity, max_moisture, max_ash))
+    moisture, ash, _ = _arrays(keys)
+    margin = np.broadcast_to(margin_per_kg(keys, cge, co2_capture, prices), (n, k))
+
+    # Three constraint rows per site, each touching only that site's k variables
+    coeffs = np.stack([
+        np.ones((n, k)),                                                         # sum x <= capacity
+        moisture[None, :] - max_moisture[:, None],                               # blend moisture <= max
+        (1 - moisture[None, :] / 100) * (ash[None, :] - max_ash[:, None]),       # blend ash <= max
+    ], axis=1)                                                                   # (n, 3, k)
+    rows = np.broadcast_to(np.arange(3 * n).reshape(n, 3, 1), (n, 3, k))
+    cols = np.broadcast_to(np.arange(n * k).reshape(n, 1, k), (n, 3, k))
+    a_ub = sparse.csr_matrix((coeffs.ravel(), (rows.ravel(), cols.ravel())), shape=(3 * n, n * k))
+    b_ub = np.stack([capacity, np.zeros(n), np.zeros(n)], axis=1).ravel()
+
+    res = linprog(-margin.ravel(), A_ub=a_ub, b_ub=b_ub,
+                  bounds=np.column_stack([np.zeros(n * k), available.ravel()]), method="highs")
+    if res.status != 0:
+        raise RuntimeError(f"blend LP failed: {res.message}")
+    feed = np.maximum(res.x.reshape(n, k), 0.0)
+    return {"keys": keys, "feed": feed, "margin": (feed * margin).sum(axis=1)}
+
+
+def blend_properties(feed: dict) -> dict:
+    """Total feed, blend moisture/ash and dry-weighted yields for {key: kg/hr wet}."""
+    total = sum(feed.values())
+    dry = {key: x * (1 - FEEDSTOCKS[key]["moisture"] / 100) for key, x in feed.items()}
+    total_dry = sum(dry.values())
+    if total <= 0 or total_dry <= 0:
+        return {"feed_rate": 0.0, "moisture": 0.0, "ash": 0.0, "yields": dict(DEFAULT_YIELDS)}
+    return {
+        "feed_rate": total,
+        "moisture": 100 * (1 - total_dry / total),
+        "ash": sum(d * FEEDSTOCKS[key]["composition"]["ash"] for key, d in dry.items()) / total_dry,
+        "yields": {p: sum(d * FEEDSTOCKS[key]["yields"][p] for key, d in dry.items()) / total_dry
+                   for p in DEFAULT_YIELDS},
+    }
+
+
+def optimize_blend(available: dict, capacity, max_moisture=DEFAULT_MAX_MOISTURE, max_ash=DEFAULT_MAX_ASH,
+                   cge=0.75, co2_capture=90, unit_multiplier=1, prices=PRICES) -> dict:
+    """Optimal blend for one site: {"feed": {key: kg/hr}, "blend": blend_properties, "performance": ...}."""
+    keys = list(available)
+    result = optimize_blends([[available[key] for key in keys]], capacity, max_moisture, max_ash,
+                             cge, co2_capture, prices, keys=keys)
+    feed = {key: float(x) for key, x in zip(keys, result["feed"][0])}
+    blend = blend_properties(feed)
+    performance = compute_performance(blend["feed_rate"], blend["moisture"], cge, co2_capture,
+                                      unit_multiplier, prices, yields=blend["yields"])
+    return {"feed": feed, "blend": blend, "performance": performance}
+
+
+def _optimize_csv(path: str, out):
+    """Sites CSV: site, capacity, optional max_moisture/max_ash/cge/co2_capture, one column per feedstock key."""
+    import numpy as np
+
+    with open(path, newline="", encoding="utf-8") as f:
+        sites = list(csv.DictReader(f))
+    if not sites:
+        raise SystemExit(f"{path}: no site rows (expected a header plus one row per site)")
+    keys = [key for key in FEEDSTOCKS if key in sites[0]]
+    if not keys:
+        raise SystemExit(f"{path}: no feedstock columns; expected some of {', '.join(FEEDSTOCKS)}")
+    col = lambda name, default: np.array([float(s.get(name) or default) for s in sites])
+    cge, co2_capture = col("cge", 0.75), col("co2_capture", 90)
+    result = optimize_blends(
+        np.array([[float(s[key] or 0) for key in keys] for s in sites]), col("capacity", 0),
+        col("max_moisture", DEFAULT_MAX_MOISTURE), col("max_ash", DEFAULT_MAX_ASH), cge, co2_capture, keys=keys,
+    )
+    writer = csv.writer(out)
+    writer.writerow(["site", *keys, "feed_rate", "moisture", "ash", "net_revenue"])
+    for i, site in enumerate(sites):
+        feed = dict(zip(keys, result["feed"][i]))
+        blend = blend_properties(feed)
+        perf = compute_performance(blend["feed_rate"], blend["moisture"], cge[i], co2_capture[i], 1, PRICES,
+                                   yields=blend["yields"])
+        writer.writerow([site.get("site", i), *(f"{x:.1f}" for x in feed.values()), f"{blend['feed_rate']:.1f}",
+                         f"{blend['moisture']:.2f}", f"{blend['ash']:.2f}", f"{perf['net_revenue']:.2f}"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feedstock library and blend optimizer")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    o = sub.add_parser("optimize", help="optimal blend per site (net revenue per hour)")
+    o.add_argument("sites")
+    o.add_argument("--out", default="-")
+    args = parser.parse_args()
+    if args.cmd == "list":
+        print(json.dumps(FEEDSTOCKS, indent=2))
+    elif args.out == "-":
+        _optimize_csv(args.sites, sys.stdout)
+    else:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            _optimize_csv(args.sites, f)
@@ -0,0 +1,138 @@
+"""Plotly figure builders shared by the dashboard and the offline report renderer."""
+import plotly.graph_objects as go
+
+from plant_model import sankey_flows
+
+# Technology scorecard shown on the radar chart
+RADAR_CATEGORIES = ['Efficiency', 'Environmental', 'Economic', 'Scalability', 'Innovation']
+RADAR_VALUES = [85, 92, 78, 88, 95] # Example values, ideally would be derived from model
+
+
+def sankey_figure(performance, feed_rate, moisture, unit_multiplier):
+    flows = sankey_flows(performance, feed_rate, moisture, unit_multiplier)
+
+    # Define colors for links, mirroring node colors if possible
+    link_colors = [
+        "rgba(59,130,246,0.5)",   # Waste Feed -> Drying
+        "rgba(6,182,212,0.5)",    # Drying -> Gasification
+        "rgba(245,158,11,0.5)",   # Gasification -> Gas Cleanup
+        "rgba(16,185,129,0.5)",   # Gas Cleanup -> WGS Reactor
+        "rgba(139,92,246,0.5)",   # WGS Reactor -> Separation
+        "rgba(34,197,94,0.7)",    # Separation -> H2 Product (stronger for primary product)
+        "rgba(249,115,22,0.7)",   # Separation -> MeOH Product
+        "rgba(234,179,8,0.7)",    # Separation -> SAF Product
+        "rgba(239,68,68,0.5)",    # WGS Reactor -> CO2 Capture
+        "rgba(113,113,122,0.3)"   # Gasification -> Waste Heat (lighter for by-product)
+    ]
+
+    fig = go.Figure(go.Sankey(
+        arrangement="snap",
+        node=dict(
+            pad=20,
+            thickness=25,
+            line=dict(color="rgba(0,0,0,0.5)", width=2),
+            label=flows["labels"],
+            color=[
+                "#3b82f6", "#06b6d4", "#f59e0b", "#10b981", 
+                "#8b5cf6", "#6366f1", "#22c55e", "#f97316", 
+                "#eab308", "#ef4444", "#71717a"
+            ]
+        ),
+        link=dict(
+            source=flows["sources"],
+            target=flows["targets"],
+            value=flows["values"],
+            color=link_colors,
+            hovertemplate="%{source.label} → %{target.label}<br>%{value:.1f} kg" + ('/hr' if unit_multiplier == 1 else '/day') + "<extra></extra>"
+        )
+    ))
+
+    fig.update_layout(
+        title_text=f"Real-Time Process Flow (kg{'/hr' if unit_multiplier == 1 else '/day'})",
+        font_size=14,
+        height=500,
+        margin=dict(t=50, l=50, r=50, b=50),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white'
+    )
+    return fig
+
+
+def waterfall_figure(performance, prices, unit_multiplier, unit_text):
+    waterfall_data = {
+        "labels": ["Revenue Base", "H₂ Sales", "SAF Sales", "MeOH Sales", "CO₂ Credits", "OpEx", "Tax", "Net Value"],
+        "measures": ["absolute", "relative", "relative", "relative", "relative", "relative", "relative", "total"],
+        "values": [0, 
+                   performance['h2_output']/unit_multiplier * prices["h2"] * unit_multiplier, # H2 Revenue
+                   performance['saf_output']/unit_multiplier * prices["saf"] * unit_multiplier, # SAF Revenue
+                   performance['methanol_output']/unit_multiplier * prices["meoh"] * unit_multiplier, # MeOH Revenue
+                   performance['co2_captured']/unit_multiplier/1000 * prices["co2"] * unit_multiplier, # CO2 Credits
+                   -performance['opex'], # Operating Expenses
+                   -performance['tax'], # Tax
+                   0] # Net Value (will be calculated by Plotly as total)
+    }
+
+    fig = go.Figure(go.Waterfall(
+        name="Value Chain",
+        orientation="v",
+        measure=waterfall_data["measures"],
+        x=waterfall_data["labels"],
+        y=waterfall_data["values"],
+        textposition="outside",
+        text=[f"${v:,.0f}" if v != 0 else "" for v in waterfall_data["values"]], # Don't show text for 0
+        connector={"line": {"color": "rgba(255,255,255,0.3)"}},
+        increasing={"marker": {"color": "#10b981"}},
+        decreasing={"marker": {"color": "#ef4444"}},
+        totals={"marker": {"color": "#3b82f6"}}
+    ))
+
+    # (Item 3) Clearer units/hover for finance audience
+    fig.update_traces(
+        hovertemplate="%{x}: <b>$%{y:,.0f}" + unit_text + "</b><extra></extra>"
+    )
+    fig.update_layout(
+        title=f"Economic Value Waterfall ($ {unit_text})",
+        yaxis_title=f"Value ($ {unit_text})",
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white'
+    )
+    return fig
+
+
+def radar_figure(categories=RADAR_CATEGORIES, values=RADAR_VALUES):
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=values + [values[0]],
+        theta=categories + [categories[0]],
+        fill='toself',
+        name='SustainaPower Performance',
+        fillcolor='rgba(59, 130, 246, 0.3)',
+        line_color='#3b82f6'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100],
+                gridcolor='rgba(255,255,255,0.2)',
+                linecolor='rgba(255,255,255,0.5)'
+            ),
+            angularaxis=dict(
+                rotation=90,
+                direction="clockwise",
+                linecolor='rgba(255,255,255,0.5)'
+            )
+        ),
+        showlegend=True,
+        title="Technology Performance Scorecard",
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='white',
+        legend=dict(x=0.01, y=0.99, bgcolor='rgba(0,0,0,0)')
+    )
+    return fig
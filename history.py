@@ -0,0 +1,185 @@
+"""Local KPI history with incremental multi-resolution rollups.
+
+Samples are never stored raw. Each write is folded into 1-minute, 1-hour and
+1-day buckets (count/sum/min/max per KPI) in a SQLite file, so a chart query
+reads at most ~max_points rows from the coarsest rollup that still resolves
+its window, whether the window is an hour or a year.
+
+    store = HistoryStore("kpi_history.sqlite")
+    store.record_many(ts_array, {"h2_output": [...], "net_revenue": [...]})
+    series = store.query("net_revenue", start, end, max_points=500)
+
+Every server replica can read the store, but only one process at a time
+folds samples into it (claim_writer(), an flock on <path>.writer), so
+replicas ingesting the same stream don't multiply the counts.
+
+Seed a demo history:  python history.py backfill --days 120
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, one server process assumed
+    fcntl = None
+
+# Resolution name -> bucket width in seconds, finest first
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# How long each rollup is kept (seconds); None keeps it forever
+RETENTION = {"1m": 14 * 86400, "1h": 2 * 365 * 86400, "1d": None}
+
+
+class HistoryStore:
+    """SQLite-backed rollup store; safe to share between threads and server processes (WAL mode)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writer_fd = None
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for res in RESOLUTIONS:
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS rollup_{res} (
+                        bucket INTEGER NOT NULL, kpi TEXT NOT NULL,
+                        n INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL,
+                        PRIMARY KEY (kpi, bucket)
+                    ) WITHOUT ROWID""")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def claim_writer(self) -> bool:
+        """True if this process is (or just became) the store's single writer.
+
+        The lock is released when the process exits, so another replica takes over
+        on its next claim.
+        """
+        if self._writer_fd is not None or fcntl is None:
+            return True
+        fd = os.open(self.path + ".writer", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._writer_fd = fd
+        return True
+
+    def record(self, ts: float, kpis: dict):
+        self.record_many([ts], {k: [v] for k, v in kpis.items()})
+
+    def record_many(self, ts, columns: dict):
+        """Fold samples (timestamps + one sequence per KPI) into every rollup in one transaction."""
+        import numpy as np  # deferred like the rest of the heavy imports; history is imported at app start
+
+        ts = np.asarray(ts, dtype=np.float64)
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        upserts = {res: [] for res in RESOLUTIONS}
+        for kpi, values in columns.items():
+            v = np.asarray(values, dtype=np.float64)[order]
+            keep = ~np.isnan(v)
+            t, v = ts[keep], v[keep]
+            if not len(v):
+                continue
+            for res, width in RESOLUTIONS.items():
+                # Pre-aggregate so a batch costs one upsert per (bucket, kpi), not per sample
+                buckets = (t // width).astype(np.int64) * width
+                starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+                upserts[res].extend(zip(
+                    buckets[starts].tolist(), [kpi] * len(starts), np.diff(np.r_[starts, len(v)]).tolist(),
+                    np.add.reduceat(v, starts).tolist(), np.minimum.reduceat(v, starts).tolist(),
+                    np.maximum.reduceat(v, starts).tolist(),
+                ))
+        with self._conn() as conn:
+            for res, rows in upserts.items():
+                conn.executemany(f"""
+                    INSERT INTO rollup_{res} (bucket, kpi, n, sum, min, max) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (kpi, bucket) DO UPDATE SET
+                        n = n + excluded.n, sum = sum + excluded.sum,
+                        min = MIN(min, excluded.min), max = MAX(max, excluded.max)
+                """, rows)
+
+    @staticmethod
+    def pick_resolution(start: float, end: float, max_points: int) -> str:
+        """Finest rollup whose bucket count over [start, end) fits in max_points (else the coarsest)."""
+        for res, width in RESOLUTIONS.items():
+            if (end - start) / width <= max_points:
+                return res
+        return list(RESOLUTIONS)[-1]
+
+    def query(self, kpi: str, start: float, end: float, max_points: int = 500) -> dict:
+        """Bucketed series for one KPI: {"resolution", "ts", "mean", "min", "max"} (chronological)."""
+        res = self.pick_resolution(start, end, max_points)
+        width = RESOLUTIONS[res]
+        rows = self._conn().execute(
+            f"SELECT bucket, sum / n, min, max FROM rollup_{res} WHERE kpi = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (kpi, int(start // width) * width, end),
+        ).fetchall()
+        return {
+            "resolution": res,
+            "ts": [r[0] for r in rows], "mean": [r[1] for r in rows],
+            "min": [r[2] for r in rows], "max": [r[3] for r in rows],
+        }
+
+    def kpis(self) -> list:
+        return [r[0] for r in self._conn().execute(f"SELECT DISTINCT kpi FROM rollup_{list(RESOLUTIONS)[-1]} ORDER BY kpi")]
+
+    def prune(self, now: float = None):
+        """Drop buckets older than each resolution's retention period."""
+        now = time.time() if now is None else now
+        with self._conn() as conn:
+            for res, keep in RETENTION.items():
+                if keep is not None:
+                    conn.execute(f"DELETE FROM rollup_{res} WHERE bucket < ?", (now - keep,))
+
+
+def open_store(path: str):
+    """HistoryStore for `path`, or None if the file can't be opened or created (read-only directory etc.)."""
+    try:
+        return HistoryStore(path)
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def _backfill(path: str, days: float, step_s: float):
+    import numpy as np
+    from plant_model import PRICES, compute_performance_batch
+
+    store = HistoryStore(path)
+    end = time.time()
+    ts = np.arange(end - days * 86400, end, step_s)
+    rng = np.random.default_rng(0)
+    feed = 1000 * (1 + 0.1 * np.sin(ts / 86400 * 2 * np.pi)) + rng.normal(0, 20, len(ts))
+    moisture = 20 + 5 * np.sin(ts / (30 * 86400) * 2 * np.pi) + rng.normal(0, 0.5, len(ts))
+    perf = compute_performance_batch(feed, moisture, 0.75, 90, 1, PRICES)
+    for start in range(0, len(ts), 50_000):
+        sl = slice(start, start + 50_000)
+        store.record_many(ts[sl], {k: v[sl] for k, v in perf.items()})
+    store.prune()
+    print(f"Backfilled {len(ts):,} samples over {days} days into {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KPI history store maintenance")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("backfill", help="seed synthetic history for demos")
+    b.add_argument("--db", default=os.environ.get("SUSTAINAPOWER_HISTORY_DB", "kpi_history.sqlite"))
+    b.add_argument("--days", type=float, default=120)
+    b.add_argument("--step", type=float, default=60, help="seconds between synthetic samples")
+    p = sub.add_parser("prune")
+    p.add_argument("--db", default=os.environ.get("SUSTAINAPOWER_HISTORY_DB", "kpi_history.sqlite"))
+    args = parser.parse_args()
+    if args.cmd == "backfill":
+        _backfill(args.db, args.days, args.step)
+    else:
+        HistoryStore(args.db).prune()
@@ -0,0 +1,173 @@
+"""SustainaPower plant performance model.
+
+Pure functions shared by the Streamlit app and the offline tools (surrogate
+table builder, exporters, API). Nothing in here imports Streamlit.
+"""
+
+# Bump whenever the equations below change so cached/precomputed results are invalidated.
+MODEL_VERSION = "1.0"
+
+# ---- Prices/assumptions used across cached perf calc (Item 5) ----
+# Pass this dict into the cache so changes invalidate correctly.
+PRICES = {
+    "h2": 6.0,                # $/kg
+    "meoh": 0.45,             # $/kg
+    "saf": 1.2,               # $/kg
+    "co2": 50.0,              # $/t CO2
+    "opex_per_kg_dry": 0.042  # $/kg-dry (per hr), multiplied by 24 if daily
+}
+
+# Product yields per kg dry feed at 100% cold gas efficiency (mixed municipal organics).
+# Other feedstocks pass their own yields; see feedstock.py.
+DEFAULT_YIELDS = {"h2": 0.12, "meoh": 0.15, "saf": 0.08}
+
+# Order of the values returned by compute_performance (also the column order of batch results)
+KPI_FIELDS = (
+    "feed_dry", "h2_output", "co2_captured", "methanol_output", "saf_output",
+    "total_revenue", "opex", "tax", "net_revenue",
+)
+
+
+def compute_performance(feed_rate, moisture, cge, co2_capture, unit_multiplier, prices, yields=None):
+    yields = yields or DEFAULT_YIELDS
+    feed_dry = feed_rate * (1 - moisture/100)
+    h2_output = feed_dry * yields["h2"] * cge
+    co2_captured = h2_output * 8.8 * (co2_capture/100)
+    methanol_output = feed_dry * yields["meoh"] * cge
+    saf_output = feed_dry * yields["saf"] * cge
+
+    # Revenue calculation
+    h2_revenue = h2_output * prices["h2"] * unit_multiplier
+    methanol_revenue = methanol_output * prices["meoh"] * unit_multiplier
+    saf_revenue = saf_output * prices["saf"] * unit_multiplier
+    co2_revenue = (co2_captured/1000) * prices["co2"] * unit_multiplier # CO2 price is per tonne
+
+    total_revenue = h2_revenue + methanol_revenue + saf_revenue + co2_revenue
+
+    # Costs
+    opex = feed_dry * prices["opex_per_kg_dry"] * unit_multiplier
+    tax = max(0, (total_revenue - opex) * 0.20) # Simple 20% tax on profit
+    net_revenue = total_revenue - opex - tax
+
+    return {
+        'feed_dry': feed_dry,
+        'h2_output': h2_output * unit_multiplier,
+        'co2_captured': co2_captured * unit_multiplier,
+        'methanol_output': methanol_output * unit_multiplier,
+        'saf_output': saf_output * unit_multiplier,
+        'total_revenue': total_revenue,
+        'opex': opex,
+        'tax': tax,
+        'net_revenue': net_revenue
+    }
+
+
+def compute_performance_batch(feed_rate, moisture, cge, co2_capture, unit_multiplier, prices, yields=None):
+    """Vectorized compute_performance: array-like inputs (and yields values) broadcast, returns a dict of NumPy arrays."""
+    import numpy as np  # kept local so importing this module stays cheap for the app
+
+    yields = yields or DEFAULT_YIELDS
+    feed_rate, moisture, cge, co2_capture, unit_multiplier = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in (feed_rate, moisture, cge, co2_capture, unit_multiplier))
+    )
+    feed_dry = feed_rate * (1 - moisture/100)
+    h2_output = feed_dry * np.asarray(yields["h2"]) * cge
+    co2_captured = h2_output * 8.8 * (co2_capture/100)
+    methanol_output = feed_dry * np.asarray(yields["meoh"]) * cge
+    saf_output = feed_dry * np.asarray(yields["saf"]) * cge
+
+    total_revenue = (
+        h2_output * prices["h2"] + methanol_output * prices["meoh"] + saf_output * prices["saf"]
+        + (co2_captured/1000) * prices["co2"]
+    ) * unit_multiplier
+    opex = feed_dry * prices["opex_per_kg_dry"] * unit_multiplier
+    tax = np.maximum(0, (total_revenue - opex) * 0.20)
+
+    return {
+        'feed_dry': feed_dry,
+        'h2_output': h2_output * unit_multiplier,
+        'co2_captured': co2_captured * unit_multiplier,
+        'methanol_output': methanol_output * unit_multiplier,
+        'saf_output': saf_output * unit_multiplier,
+        'total_revenue': total_revenue,
+        'opex': opex,
+        'tax': tax,
+        'net_revenue': total_revenue - opex - tax
+    }
+
+
+# Sidebar slider ranges (min, max) for the model inputs; used for sweeps
+INPUT_RANGES = {
+    "feed_rate": (500, 5000),
+    "moisture": (5, 50),
+    "cge": (0.4, 0.9),
+    "co2_capture": (0, 95),
+}
+
+
+def sweep_batches(prices, unit_multiplier=1, steps: int = 10, ranges: dict = None, batch_size: int = 100_000):
+    """Yield column batches of the model over the full-factorial grid of `steps` points per input.
+
+    Rows are generated batch by batch, so a sweep with millions of rows never has
+    to be materialized (see export.py for the matching writers).
+    """
+    import numpy as np
+
+    ranges = ranges or INPUT_RANGES
+    names = ("feed_rate", "moisture", "cge", "co2_capture")
+    axes = [np.linspace(*ranges[n], steps) for n in names]
+    shape = tuple(len(a) for a in axes)
+    total = int(np.prod(shape))
+    for start in range(0, total, batch_size):
+        idx = np.unravel_index(np.arange(start, min(start + batch_size, total)), shape)
+        cols = {n: a[i] for n, a, i in zip(names, axes, idx)}
+        perf = compute_performance_batch(cols["feed_rate"], cols["moisture"], cols["cge"], cols["co2_capture"],
+                                         unit_multiplier, prices)
+        yield {**cols, **perf}
+
+
+# --- Physically consistent Sankey (Item 1) ---
+SANKEY_LABELS = [
+    "Waste Feed", "Drying", "Gasification", "Gas Cleanup",
+    "WGS Reactor", "Separation", "H₂ Product", "MeOH Product",
+    "SAF Product", "CO₂ Capture", "Waste Heat"
+]
+
+
+def sankey_flows(performance, feed_rate, moisture, unit_multiplier):
+    """Node-balanced Sankey links (per hour) for a compute_performance result: sources, targets, values."""
+    # Base flows (@ /hr if unit_multiplier==1)
+    feed_flow = float(feed_rate)
+    dry_flow  = float(feed_rate * (1 - moisture/100))
+    # Products (convert back to per hour for node balance)
+    h2_flow   = float(performance['h2_output'] / unit_multiplier)
+    meoh_flow = float(performance['methanol_output'] / unit_multiplier)
+    saf_flow  = float(performance['saf_output'] / unit_multiplier)
+    co2_flow  = float(performance['co2_captured'] / unit_multiplier)
+
+    # Calculate intermediate flows based on simplified efficiencies (must be consistent with performance calc)
+    # These are simplified for the Sankey, full mass balance would be more complex
+    gasifier_out = dry_flow * 0.85 # Assume 85% mass conversion to syngas from dry feedstock
+    cleanup_out  = gasifier_out * 0.95 # Assume 95% syngas recovery after cleanup
+    wgs_out      = cleanup_out  # Simplified: assume mass conserved through WGS, only composition changes
+
+    # Sum of products for separation stage output
+    sep_out_sum  = h2_flow + meoh_flow + saf_flow
+
+    # Waste heat for visualization (simplified, 30% of dry feed energy equiv)
+    waste_heat   = max(0.0, dry_flow * 0.30)
+
+    # Clamp products if rounding or simplified model causes output to exceed input for separation
+    if sep_out_sum > wgs_out and sep_out_sum > 0:
+        scale = wgs_out / sep_out_sum
+        h2_flow, meoh_flow, saf_flow = h2_flow*scale, meoh_flow*scale, saf_flow*scale
+        sep_out_sum = wgs_out # Adjust sum after scaling
+
+    sources = [0, 1, 2, 3, 4, 5, 5, 5, 4, 2] # From index
+    targets = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10] # To index
+    values  = [
+        feed_flow, dry_flow, gasifier_out, cleanup_out,
+        wgs_out,   h2_flow,  meoh_flow,    saf_flow,
+        co2_flow,  waste_heat
+    ]
+    return {"labels": SANKEY_LABELS, "sources": sources, "targets": targets, "values": values}
@@ -0,0 +1,194 @@
+"""Offline rendering of dashboard figures into the evidence bundle.
+
+Static images are rendered with kaleido in a process pool, since each render
+is CPU-bound and kaleido is not thread-safe. Images are cached in the shared
+result cache (cache.py) by a hash of the figure's JSON, render format and
+scale, so a chart that did not change is never rendered again, in this
+process or any other replica. Without kaleido, or for a figure whose render
+fails, the figure is included as standalone HTML instead.
+"""
+import atexit
+import base64
+import concurrent.futures
+import contextlib
+import hashlib
+import html
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import cache
+
+logger = logging.getLogger(__name__)
+
+KALEIDO_AVAILABLE = importlib.util.find_spec("kaleido") is not None
+
+# Dark background for static exports: the dashboard figures are transparent with white text
+EXPORT_LAYOUT = {"paper_bgcolor": "#0f172a", "plot_bgcolor": "#0f172a", "font_color": "white"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: int = None):
+    # One long-lived pool per process so kaleido's renderer subprocesses stay warm between bundles.
+    # "spawn" because the server process runs background threads, which fork() does not copy safely.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = max_workers or min(4, os.cpu_count() or 1)
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                          mp_context=multiprocessing.get_context("spawn"))
+            with _workers_without_main():
+                # Workers are spawned on demand, one per submit() while none is idle: start all of
+                # them now so __main__ only has to be hidden here, not around every render
+                for _ in range(workers):
+                    pool.submit(os.getpid)
+            atexit.register(pool.shutdown, cancel_futures=True)
+            _pool = pool
+        return _pool
+
+
+def _discard_pool(pool):
+    # A worker died (OOM, killed): the executor is unusable for good, so the next render gets a new one
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextlib.contextmanager
+def _workers_without_main():
+    # Streamlit executes the app script as __main__, and spawned workers re-import __main__
+    # before running anything: they would run the whole app. The preparation data is taken when
+    # a worker starts, so hide it for that long. Streamlit reassigns __main__ at the start of
+    # every script run, which is why this only happens while a pool is being created.
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _render(fig_json: str, fmt: str, scale: float) -> bytes:
+    # Runs in a worker process
+    import plotly.io as pio
+    return pio.from_json(fig_json).to_image(format=fmt, scale=scale)
+
+
+def _export_json(fig) -> str:
+    fig = fig.__class__(fig)  # copy; don't restyle the figure the dashboard is showing
+    fig.update_layout(**EXPORT_LAYOUT)
+    return fig.to_json()
+
+
+def figure_key(fig_json: str, fmt: str, scale: float) -> str:
+    return cache.make_key("report_image", hashlib.sha256(fig_json.encode("utf-8")).hexdigest(), fmt, scale)
+
+
+def _render_pending(pending: dict, fmt: str, scale: float) -> dict:
+    # {name: bytes} for the renders that succeeded; a broken pool is replaced and its renders retried once
+    images, failed = {}, set()
+    for attempt in range(2):
+        pool = _get_pool()
+        futures, broken = {}, False
+        try:
+            for name, (_, fig_json) in pending.items():
+                if name not in images and name not in failed:
+                    futures[name] = pool.submit(_render, fig_json, fmt, scale)
+        except BrokenProcessPool:
+            broken = True
+        for name, future in futures.items():
+            try:
+                images[name] = future.result()
+            except BrokenProcessPool:
+                broken = True
+            except Exception:
+                logger.exception("rendering figure %r failed", name)
+                failed.add(name)
+        if not broken:
+            break
+        logger.warning("render pool broke (attempt %d); starting a new one", attempt + 1)
+        _discard_pool(pool)
+    return images
+
+
+def render_images(figures: dict, fmt: str = "png", scale: float = 2.0) -> dict:
+    """Render {name: plotly Figure} to {name: image bytes}, reusing cached renders.
+
+    Figures that fail to render are left out of the result.
+    """
+    backend = cache.get_backend()
+    images, pending = {}, {}
+    for name, fig in figures.items():
+        fig_json = _export_json(fig)
+        key = figure_key(fig_json, fmt, scale)
+        data = backend.get_bytes(key)
+        if data is not None:
+            images[name] = data
+        else:
+            pending[name] = (key, fig_json)
+
+    if pending:
+        for name, data in _render_pending(pending, fmt, scale).items():
+            images[name] = data
+            try:
+                backend.set_bytes(pending[name][0], data)
+            except OSError:
+                pass  # still usable for this bundle, just not cached
+    return {name: images[name] for name in figures if name in images}
+
+
+def render_report_html(title: str, sections: list, images: dict, fmt: str = "png") -> str:
+    """Self-contained HTML report: text sections followed by the embedded figure images."""
+    mime = {"png": "image/png", "svg": "image/svg+xml", "jpeg": "image/jpeg"}[fmt]
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{font-family:Inter,Arial,sans-serif;background:#0f172a;color:#e2e8f0;max-width:960px;margin:2rem auto;}"
+        "h1,h2{color:#93c5fd}table{border-collapse:collapse}td{padding:.25rem 1rem;border-bottom:1px solid #334155}"
+        "img{width:100%;border-radius:12px;margin:1rem 0}</style></head><body>",
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>Generated {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}</p>",
+    ]
+    for heading, rows in sections:
+        parts.append(f"<h2>{html.escape(heading)}</h2><table>")
+        parts.extend(f"<tr><td>{html.escape(str(k))}</td><td>{html.escape(str(v))}</td></tr>" for k, v in rows)
+        parts.append("</table>")
+    for name, data in images.items():
+        b64 = base64.b64encode(data).decode("ascii")
+        parts.append(f"<h2>{html.escape(name.replace('_', ' ').title())}</h2><img alt='{html.escape(name)}' src='data:{mime};base64,{b64}'>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def report_files(figures: dict, performance: dict, params: dict, unit_text: str, fmt: str = "png") -> dict:
+    """Evidence-bundle entries for the figures: figures/<name>.<fmt> (or .html) plus report.html."""
+    sections = [
+        ("Process Parameters", list(params.items())),
+        ("Performance", [(k, f"{v:,.2f}" + ("" if k == "feed_dry" else f" {unit_text}")) for k, v in performance.items()]),
+    ]
+    if not KALEIDO_AVAILABLE:
+        # No static renderer installed: ship interactive figures instead of images
+        files = {f"figures/{name}.html": fig.to_html(include_plotlyjs="cdn", full_html=True) for name, fig in figures.items()}
+        files["report.html"] = render_report_html("SustainaPower Evidence Report", sections, {})
+        return files
+    images = render_images(figures, fmt=fmt)
+    files = {f"figures/{name}.{fmt}": data for name, data in images.items()}
+    # Figures whose render failed still ship, as interactive HTML
+    files.update({f"figures/{name}.html": fig.to_html(include_plotlyjs="cdn", full_html=True)
+                  for name, fig in figures.items() if name not in images})
+    files["report.html"] = render_report_html("SustainaPower Evidence Report", sections, images, fmt=fmt)
+    files["figures/index.json"] = json.dumps(
+        {name: hashlib.sha256(data).hexdigest() for name, data in images.items()}, indent=2
+    )
+    return files
@@ -0,0 +1,122 @@
+"""Cold-start helpers for the Streamlit entry point.
+
+- lazy_import(): module proxies that import on first attribute access, so the
+  first page can start rendering before plotly/pandas/requests are loaded.
+  While a warm-up is importing, proxies wait for it, so only a run that
+  actually reaches plotly/pandas code blocks, and only from that point
+- warm_up(): imports those modules on a background thread, in two phases:
+  what the first page needs as soon as the process starts, the rest once the
+  first page has rendered
+- record_first_render(): per-process startup timings for the admin panel/logs
+"""
+import importlib
+import importlib.util
+import threading
+import time
+
+# Wall-clock time this module was first imported (≈ server start for `streamlit run`)
+IMPORTED_AT = time.time()
+
+# Heavy modules needed to render the first page, and those only needed by later interactions
+FIRST_PAINT_MODULES = ("plotly.graph_objects", "requests")
+DEFERRED_MODULES = ("pandas", "pyarrow")
+
+_timings = {}
+_lock = threading.Lock()
+_warm_thread = None
+
+
+class _LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Also after the first import: plotly probes sys.modules for pandas, which must not be
+        # seen half-initialised while the deferred warm-up is importing it
+        if _warm_thread is not None and _warm_thread.is_alive():
+            wait_for_warm_up()
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r} ({'loaded' if self._module else 'not loaded'})>"
+
+
+def lazy_import(name: str):
+    """Proxy that imports `name` on first use and holds attribute access while a warm-up is running."""
+    return _LazyModule(name)
+
+
+def is_available(name: str) -> bool:
+    """Whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def process_start_time() -> float:
+    """Epoch seconds when this OS process started (Linux /proc), else when this module was imported."""
+    try:
+        import os
+        with open("/proc/self/stat", "rb") as f:
+            start_ticks = int(f.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/stat", "rb") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith(b"btime"))
+        return btime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return IMPORTED_AT
+
+
+def _warm(names):
+    for name in names:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue  # optional dependency not installed
+        with _lock:
+            _timings[f"warm_up:{name}_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    with _lock:
+        _timings["warm_up_done_s"] = round(time.time() - process_start_time(), 3)
+
+
+def warm_up(names) -> threading.Thread:
+    """Import `names` on a daemon thread so the app's first use of each finds it in sys.modules."""
+    global _warm_thread
+    wait_for_warm_up()
+    _warm_thread = threading.Thread(target=_warm, args=(tuple(names),), daemon=True, name="import-warm-up")
+    _warm_thread.start()
+    return _warm_thread
+
+
+def wait_for_warm_up():
+    """Block until a running warm-up finishes.
+
+    Importing a package while another thread is still initialising it (or one of
+    its dependencies) can hand out a half-initialised module: plotly, for one,
+    probes sys.modules for pandas. Lazy modules call this while a warm-up is
+    running, and code that imports heavy packages directly should too.
+    """
+    thread = _warm_thread
+    if thread is not None and thread is not threading.current_thread():
+        thread.join()
+
+
+def record_first_render(script_seconds: float) -> bool:
+    """Record timings for this process's first completed script run; True only the first time."""
+    with _lock:
+        if "first_render_s" in _timings:
+            return False
+        _timings["first_script_run_s"] = round(script_seconds, 3)
+        _timings["first_render_s"] = round(time.time() - process_start_time(), 3)
+        return True
+
+
+def timings() -> dict:
+    with _lock:
+        return dict(_timings)
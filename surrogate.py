@@ -0,0 +1,243 @@
+"""Precomputed surrogate lookup tables for the plant model.
+
+The offline build step evaluates the exact model on a grid spanning the sidebar
+ranges and writes the results as .npy files. At runtime the files are opened
+with ``mmap_mode="r"`` so every server process on the node maps the same pages
+from the OS page cache (no per-process copies), and a query is answered by
+multilinear interpolation together with an error estimate for its grid cell.
+Queries outside the grid, over tolerance, or built against different prices /
+model version fall back to the exact model.
+
+Build:  python surrogate.py build --out surrogate_tables
+Check:  python surrogate.py check --table surrogate_tables
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from plant_model import KPI_FIELDS, MODEL_VERSION, PRICES, compute_performance, compute_performance_batch
+
+# Grid axes follow the sidebar slider ranges: (name, low, high, points)
+AXES = (
+    ("feed_rate", 500.0, 5000.0, 19),
+    ("moisture", 5.0, 50.0, 10),
+    ("temperature", 700.0, 1000.0, 7),
+    ("cge", 0.4, 0.9, 11),
+    ("co2_capture", 0.0, 95.0, 20),
+)
+AXIS_NAMES = tuple(a[0] for a in AXES)
+
+# Max interpolation error allowed, as a fraction of each output's full-scale value
+DEFAULT_TOLERANCE = 1e-3
+
+# Every corner of a grid cell as 0/1 offsets per axis, shape (2**ndim, ndim)
+_CORNERS = np.array(np.meshgrid(*[[0, 1]] * len(AXES), indexing="ij")).reshape(len(AXES), -1).T
+
+
+def prices_hash(prices: dict) -> str:
+    return hashlib.sha256(json.dumps(prices, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _exact_hourly(points: np.ndarray, prices: dict) -> np.ndarray:
+    """Exact model at points (N, ndim) in AXES order -> (N, len(KPI_FIELDS)), per-hour values."""
+    cols = dict(zip(AXIS_NAMES, points.T))
+    # Temperature is an axis so the tables keep working once the equilibrium solve depends on it
+    perf = compute_performance_batch(cols["feed_rate"], cols["moisture"], cols["cge"], cols["co2_capture"], 1, prices)
+    return np.stack([perf[k] for k in KPI_FIELDS], axis=-1)
+
+
+class SurrogateTable:
+    """Read-only, memory-mapped interpolation table produced by build_tables()."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        self.cell_error = np.load(os.path.join(path, "cell_error.npy"), mmap_mode="r")
+        self.grid = [np.asarray(g, dtype=np.float64) for g in self.meta["grid"]]
+        self._grid_lists = [g.tolist() for g in self.grid]
+        self._lo = np.array([g[0] for g in self.grid])
+        self._hi = np.array([g[-1] for g in self.grid])
+
+    def matches(self, prices: dict) -> bool:
+        return self.meta["model_version"] == MODEL_VERSION and self.meta["prices_hash"] == prices_hash(prices)
+
+    def _locate(self, points: np.ndarray):
+        idx = np.empty(points.shape, dtype=np.intp)
+        frac = np.empty(points.shape, dtype=np.float64)
+        for d, g in enumerate(self.grid):
+            i = np.clip(np.searchsorted(g, points[:, d], side="right") - 1, 0, len(g) - 2)
+            idx[:, d] = i
+            frac[:, d] = (points[:, d] - g[i]) / (g[i + 1] - g[i])
+        return idx, frac
+
+    def interpolate(self, points) -> tuple:
+        """Interpolate per-hour KPIs at points (N, ndim).
+
+        Returns (values (N, n_kpi), error_estimate (N,), inside (N,) bool). The estimate is the
+        build-time interpolation error at the centre of the enclosing cell relative to full scale;
+        it is not a bound: other points in the cell can be off by more.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        inside = np.all((points >= self._lo) & (points <= self._hi), axis=1)
+        idx, frac = self._locate(points)
+        corner_idx = idx[:, None, :] + _CORNERS[None, :, :]
+        corner_vals = self.values[tuple(corner_idx[..., d] for d in range(len(AXES)))]
+        weights = np.prod(np.where(_CORNERS[None, :, :] == 1, frac[:, None, :], 1.0 - frac[:, None, :]), axis=2)
+        values = np.einsum("nc,nck->nk", weights, corner_vals)
+        error = np.asarray(self.cell_error[tuple(idx.T)], dtype=np.float64)
+        return values, error, inside
+
+    def lookup(self, feed_rate, moisture, temperature, cge, co2_capture, tolerance=DEFAULT_TOLERANCE):
+        """Single-point lookup; returns (hourly KPI dict, error_estimate) or None if the exact model is needed."""
+        # Scalar fast path: slice the 2x2x..x2 corner block and contract one axis at a time
+        cell, fracs = [], []
+        for x, g in zip((feed_rate, moisture, temperature, cge, co2_capture), self._grid_lists):
+            if not g[0] <= x <= g[-1]:
+                return None
+            i = min(bisect.bisect_right(g, x) - 1, len(g) - 2)
+            cell.append(i)
+            fracs.append((x - g[i]) / (g[i + 1] - g[i]))
+        error = float(self.cell_error[tuple(cell)])
+        if error > tolerance:
+            return None
+        block = self.values[tuple(slice(i, i + 2) for i in cell)]
+        for f in fracs:
+            block = block[0] * (1.0 - f) + block[1] * f
+        return dict(zip(KPI_FIELDS, block.tolist())), error
+
+
+def _scale_hourly(hourly: dict, unit_multiplier) -> dict:
+    # Every KPI except the dry feed rate is linear in unit_multiplier (tax included, since max(0, k*x) == k*max(0, x) for k > 0)
+    return {k: (v if k == "feed_dry" else v * unit_multiplier) for k, v in hourly.items()}
+
+
+def performance(table, feed_rate, moisture, temperature, cge, co2_capture, unit_multiplier, prices,
+                tolerance=DEFAULT_TOLERANCE) -> dict:
+    """Drop-in for compute_performance that answers from the surrogate when it is valid for the query."""
+    if table is not None and table.matches(prices):
+        hit = table.lookup(feed_rate, moisture, temperature, cge, co2_capture, tolerance)
+        if hit is not None:
+            return _scale_hourly(hit[0], unit_multiplier)
+    return compute_performance(feed_rate, moisture, cge, co2_capture, unit_multiplier, prices)
+
+
+def performance_batch(table, feed_rate, moisture, temperature, cge, co2_capture, unit_multiplier, prices,
+                      tolerance=DEFAULT_TOLERANCE) -> dict:
+    """Vectorized performance(): (N,) input arrays -> dict of (N,) KPI arrays, exact model where the table isn't valid."""
+    feed_rate, moisture, temperature, cge, co2_capture, unit_multiplier = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=np.float64))
+          for a in (feed_rate, moisture, temperature, cge, co2_capture, unit_multiplier))
+    )
+    points = np.stack([feed_rate, moisture, temperature, cge, co2_capture], axis=1)
+    if table is not None and table.matches(prices):
+        hourly, error, inside = table.interpolate(points)
+        exact = ~inside | (error > tolerance)
+        if exact.any():
+            hourly[exact] = _exact_hourly(points[exact], prices)
+    else:
+        hourly = _exact_hourly(points, prices)
+    return {k: (hourly[:, i] if k == "feed_dry" else hourly[:, i] * unit_multiplier) for i, k in enumerate(KPI_FIELDS)}
+
+
+def open_table(path: str):
+    """Open a table directory, or return None if no table has been built there."""
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return SurrogateTable(path)
+
+
+def build_tables(path: str, prices: dict = PRICES, axes=AXES, chunk: int = 16384) -> dict:
+    """Evaluate the exact model over the grid and write the table directory atomically."""
+    grid = [np.linspace(lo, hi, n) for _, lo, hi, n in axes]
+    shape = tuple(len(g) for g in grid)
+    mesh = np.stack(np.meshgrid(*grid, indexing="ij"), axis=-1).reshape(-1, len(axes))
+    values = _exact_hourly(mesh, prices).reshape(shape + (len(KPI_FIELDS),))
+    scale = np.maximum(np.abs(values).reshape(-1, len(KPI_FIELDS)).max(axis=0), 1e-12)
+
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "values.npy"), values)
+
+    # Error estimate per cell: interpolate at every cell centre and compare against the exact model
+    cell_grid = [(g[:-1] + g[1:]) / 2 for g in grid]
+    cell_shape = tuple(len(g) for g in cell_grid)
+    centres = np.stack(np.meshgrid(*cell_grid, indexing="ij"), axis=-1).reshape(-1, len(axes))
+    meta = {
+        "model_version": MODEL_VERSION,
+        "prices": prices,
+        "prices_hash": prices_hash(prices),
+        "axes": [a[0] for a in axes],
+        "grid": [g.tolist() for g in grid],
+        "kpi_fields": list(KPI_FIELDS),
+        "built_utc": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    np.save(os.path.join(tmp, "cell_error.npy"), np.zeros(cell_shape, dtype=np.float32))
+
+    table = SurrogateTable(tmp)
+    cell_error = np.empty(len(centres), dtype=np.float32)
+    for start in range(0, len(centres), chunk):
+        pts = centres[start:start + chunk]
+        approx, _, _ = table.interpolate(pts)
+        cell_error[start:start + chunk] = (np.abs(approx - _exact_hourly(pts, prices)) / scale).max(axis=1)
+    del table
+    np.save(os.path.join(tmp, "cell_error.npy"), cell_error.reshape(cell_shape))
+
+    meta["max_cell_error"] = float(cell_error.max())
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    # Swap into place; processes that already mapped the old files keep their (unlinked) copy
+    if os.path.exists(path):
+        old = f"{path}.old-{os.getpid()}"
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, path)
+    return meta
+
+
+def _check(path: str, samples: int, seed: int = 0):
+    table = open_table(path)
+    if table is None:
+        raise SystemExit(f"No surrogate table at {path}")
+    rng = np.random.default_rng(seed)
+    pts = np.column_stack([rng.uniform(g[0], g[-1], samples) for g in table.grid])
+    approx, estimate, _ = table.interpolate(pts)
+    exact = _exact_hourly(pts, table.meta["prices"])
+    scale = np.maximum(np.abs(np.asarray(table.values)).reshape(-1, len(KPI_FIELDS)).max(axis=0), 1e-12)
+    err = (np.abs(approx - exact) / scale).max(axis=1)
+
+    start = time.perf_counter()
+    for p in pts[:1000]:
+        table.lookup(*p)
+    per_lookup_us = (time.perf_counter() - start) / min(samples, 1000) * 1e6
+    print(f"max observed error {err.max():.2e} (max cell-centre estimate {estimate.max():.2e}), "
+          f"{per_lookup_us:.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or check surrogate lookup tables")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--out", default="surrogate_tables")
+    c = sub.add_parser("check")
+    c.add_argument("--table", default="surrogate_tables")
+    c.add_argument("--samples", type=int, default=10000)
+    args = parser.parse_args()
+    if args.cmd == "build":
+        meta = build_tables(args.out)
+        print(f"Built {args.out}: grid {[len(g) for g in meta['grid']]}, max cell error {meta['max_cell_error']:.2e}")
+    else:
+        _check(args.table, args.samples)
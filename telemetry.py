@@ -0,0 +1,325 @@
+"""Live plant telemetry: asyncio ingestion into fixed-size NumPy ring buffers.
+
+The stream is newline-delimited JSON, one sample per line:
+    {"ts": 1718000000.0, "feed_rate": 1010.0, "moisture": 19.6, "temperature": 851.0,
+     "h2_flow": 71.8, "meoh_flow": 89.9, "saf_flow": 47.9, "co2_flow": 569.0}
+
+Sources (SUSTAINAPOWER_TELEMETRY):
+    tcp://host:port   connect and read lines (reconnects with backoff)
+    /path/file.jsonl  tail the file like `tail -F`
+
+Stand-in stream for development:
+    python telemetry.py serve --port 9000 --hz 50
+    python telemetry.py simulate --out telemetry.jsonl --hz 50
+
+The service runs its own event loop in a daemon thread, so ingestion never
+blocks a Streamlit rerun; readers take consistent snapshots under a lock.
+Trend charts downsample with min/max buckets or LTTB before plotting.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from plant_model import PRICES, compute_performance_batch
+
+CHANNELS = ("feed_rate", "moisture", "temperature", "h2_flow", "meoh_flow", "saf_flow", "co2_flow")
+
+
+class RingBuffer:
+    """Fixed-capacity time series: float64 timestamps plus one column per channel.
+
+    Timestamps must be appended in non-decreasing order; snapshot(since=) binary-searches
+    them. TelemetryService drops out-of-order samples before they reach the buffer.
+    """
+
+    def __init__(self, capacity: int, channels=CHANNELS):
+        self.capacity = capacity
+        self.channels = tuple(channels)
+        self._ts = np.zeros(capacity, dtype=np.float64)
+        self._values = np.full((capacity, len(self.channels)), np.nan, dtype=np.float64)
+        self._head = 0  # next write position
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def extend(self, ts: np.ndarray, values: np.ndarray):
+        """Append samples (ts: (n,), values: (n, n_channels)); oldest samples are overwritten."""
+        n = len(ts)
+        if n > self.capacity:
+            ts, values, n = ts[-self.capacity:], values[-self.capacity:], self.capacity
+        with self._lock:
+            first = min(n, self.capacity - self._head)
+            self._ts[self._head:self._head + first] = ts[:first]
+            self._values[self._head:self._head + first] = values[:first]
+            if first < n:
+                self._ts[:n - first] = ts[first:]
+                self._values[:n - first] = values[first:]
+            self._head = (self._head + n) % self.capacity
+            self._count = min(self._count + n, self.capacity)
+
+    def snapshot(self, since: float = None):
+        """Chronological copy (ts, values), optionally only samples with ts >= since."""
+        with self._lock:
+            if self._count < self.capacity:
+                ts, values = self._ts[:self._count].copy(), self._values[:self._count].copy()
+            else:
+                ts = np.concatenate((self._ts[self._head:], self._ts[:self._head]))
+                values = np.concatenate((self._values[self._head:], self._values[:self._head]))
+        if since is not None:
+            start = np.searchsorted(ts, since)
+            ts, values = ts[start:], values[start:]
+        return ts, values
+
+    def column(self, values: np.ndarray, channel: str) -> np.ndarray:
+        return values[:, self.channels.index(channel)]
+
+
+def downsample_minmax(ts: np.ndarray, ys: np.ndarray, n_buckets: int):
+    """Keep the min and max sample of each of n_buckets equal-count buckets (<= 2*n_buckets points)."""
+    n = len(ts)
+    if n <= 2 * n_buckets:
+        return ts, ys
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.intp)
+    idx = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        seg = ys[lo:hi]
+        if np.isnan(seg).all():
+            continue  # channel missing for the whole bucket: nothing to plot
+        a, b = lo + int(np.nanargmin(seg)), lo + int(np.nanargmax(seg))
+        idx.extend((a, b) if a <= b else (b, a))
+    idx = np.unique(np.asarray(idx, dtype=np.intp))
+    return ts[idx], ys[idx]
+
+
+def downsample_lttb(ts: np.ndarray, ys: np.ndarray, n_out: int):
+    """Largest-Triangle-Three-Buckets: n_out points that preserve the visual shape of the series."""
+    n = len(ts)
+    if n_out >= n or n_out < 3:
+        return ts, ys
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the triangle's third vertex
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_t, avg_y = ts[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        area = np.abs((ts[prev] - avg_t) * (ys[lo:hi] - ys[prev]) - (ts[prev] - ts[lo:hi]) * (avg_y - ys[prev]))
+        prev = lo + int(np.argmax(area))
+        keep[i + 1] = prev
+    return ts[keep], ys[keep]
+
+
+def rolling_kpis(buffer: RingBuffer, window_s: float, cge: float, co2_capture: float, prices: dict):
+    """Window-average KPIs from the measured inputs via the plant model, next to the measured product flows.
+
+    Returns None when the window holds no samples.
+    """
+    ts, values = buffer.snapshot(since=time.time() - window_s)
+    if len(ts) == 0:
+        return None
+    col = lambda name: buffer.column(values, name)
+    model = compute_performance_batch(col("feed_rate"), col("moisture"), cge, co2_capture, 1, prices)
+    kpis = {k: float(np.nanmean(v)) for k, v in model.items()}
+    kpis.update({
+        "samples": int(len(ts)),
+        "feed_rate": float(np.nanmean(col("feed_rate"))),
+        "moisture": float(np.nanmean(col("moisture"))),
+        "temperature": float(np.nanmean(col("temperature"))),
+        "h2_measured": float(np.nanmean(col("h2_flow"))),
+    })
+    # Measured vs modelled H2: <1 means the plant is under-performing the model
+    kpis["h2_model_ratio"] = kpis["h2_measured"] / kpis["h2_output"] if kpis["h2_output"] else float("nan")
+    return kpis
+
+
+def _parse(line: bytes, channels):
+    try:
+        msg = json.loads(line)
+        return float(msg.get("ts", time.time())), [float(msg.get(c, "nan")) for c in channels]
+    except (ValueError, TypeError, AttributeError):
+        return None  # malformed line: drop it rather than stall the stream
+
+
+class TelemetryService:
+    """Background ingestion of a telemetry source into a RingBuffer."""
+
+    def __init__(self, source: str, capacity: int = 200_000, flush_every: int = 256,
+                 history=None, model_params: dict = None):
+        self.source = source
+        self.buffer = RingBuffer(capacity)
+        self.flush_every = flush_every
+        # Optional history.HistoryStore; each flushed block's model KPIs are folded into its rollups.
+        # Every replica fills its own ring buffer, but only the one holding the store's writer lock
+        # records history, so the same samples aren't counted once per replica.
+        self.history = history
+        self.history_writer = False
+        self.model_params = model_params or {"cge": 0.75, "co2_capture": 90, "prices": PRICES}
+        self._last_prune = 0.0
+        self.received = 0
+        self.dropped = 0  # malformed or out-of-order lines
+        self._last_ts = -math.inf
+        self.connected = False
+        self.last_error = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True,
+                                            name="telemetry-ingest")
+            self._thread.start()
+        return self
+
+    async def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                if self.source.startswith("tcp://"):
+                    host, port = self.source[len("tcp://"):].rsplit(":", 1)
+                    reader, writer = await asyncio.open_connection(host, int(port))
+                    try:
+                        await self._consume(self._socket_lines(reader))
+                    finally:
+                        writer.close()
+                else:
+                    await self._consume(self._tail_lines(self.source))
+                backoff = 1.0
+            except (OSError, asyncio.IncompleteReadError) as e:
+                self.last_error = str(e)
+            self.connected = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _socket_lines(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            yield line
+
+    async def _tail_lines(self, path):
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            while True:
+                line = f.readline()
+                if line.endswith(b"\n"):
+                    yield line
+                else:
+                    if line:
+                        f.seek(-len(line), os.SEEK_CUR)  # partial line: re-read once complete
+                    await asyncio.sleep(0.05)
+                    if os.stat(path).st_size < f.tell():
+                        return  # truncated/rotated: reopen
+
+    async def _consume(self, lines):
+        self.connected = True
+        self.last_error = None
+        ts, rows = [], []
+        last_flush = time.monotonic()
+        async for line in lines:
+            parsed = _parse(line, CHANNELS)
+            if parsed is None or not parsed[0] >= self._last_ts:  # also rejects a NaN ts
+                # Out-of-order samples are dropped so the ring buffer stays sorted by time
+                self.dropped += 1
+                continue
+            self._last_ts = parsed[0]
+            ts.append(parsed[0])
+            rows.append(parsed[1])
+            # Batch appends so the buffer lock is taken per block, not per sample
+            if len(ts) >= self.flush_every or time.monotonic() - last_flush > 0.25:
+                self._flush(np.asarray(ts), np.asarray(rows))
+                ts, rows = [], []
+                last_flush = time.monotonic()
+        if ts:
+            self._flush(np.asarray(ts), np.asarray(rows))
+
+    def _flush(self, ts: np.ndarray, rows: np.ndarray):
+        self.buffer.extend(ts, rows)
+        self.received += len(ts)
+        if self.history is not None and (self.history_writer or self._claim_history()):
+            p = self.model_params
+            col = lambda name: rows[:, CHANNELS.index(name)]
+            kpis = compute_performance_batch(col("feed_rate"), col("moisture"), p["cge"], p["co2_capture"], 1, p["prices"])
+            kpis["h2_measured"] = col("h2_flow")
+            try:
+                self.history.record_many(ts, kpis)
+                if time.monotonic() - self._last_prune > 3600:
+                    self.history.prune()
+                    self._last_prune = time.monotonic()
+            except Exception as e:  # history is best-effort; never stop ingestion over it
+                self.last_error = f"history: {e}"
+
+    def _claim_history(self) -> bool:
+        # Retried on every flush (one non-blocking flock), so a replica takes over when the writer exits
+        try:
+            self.history_writer = self.history.claim_writer()
+        except OSError as e:
+            self.last_error = f"history: {e}"
+        return self.history_writer
+
+
+def simulated_sample(t: float, feed_rate=1000.0, moisture=20.0, temperature=850.0, cge=0.75, co2_capture=90.0):
+    """One plausible sample around the given operating point (slow drift plus sensor noise)."""
+    feed = feed_rate * (1 + 0.05 * math.sin(t / 300)) + random.gauss(0, 10)
+    moist = moisture + 2 * math.sin(t / 900) + random.gauss(0, 0.3)
+    dry = feed * (1 - moist / 100)
+    h2 = dry * 0.12 * cge * random.gauss(0.97, 0.01)
+    return {
+        "ts": t, "feed_rate": feed, "moisture": moist,
+        "temperature": temperature + 10 * math.sin(t / 600) + random.gauss(0, 2),
+        "h2_flow": h2, "meoh_flow": dry * 0.15 * cge, "saf_flow": dry * 0.08 * cge,
+        "co2_flow": h2 * 8.8 * co2_capture / 100,
+    }
+
+
+async def _serve(port: int, hz: float):
+    clients = set()
+
+    async def on_client(reader, writer):
+        clients.add(writer)
+        try:
+            await reader.read()  # until the client disconnects
+        finally:
+            clients.discard(writer)
+
+    server = await asyncio.start_server(on_client, "127.0.0.1", port)
+    async with server:
+        while True:
+            line = (json.dumps(simulated_sample(time.time())) + "\n").encode("utf-8")
+            for w in list(clients):
+                if w.transport.get_write_buffer_size() > 1_000_000:
+                    w.close()  # client is not keeping up; drop it instead of buffering without bound
+                    clients.discard(w)
+                else:
+                    w.write(line)
+            await asyncio.sleep(1 / hz)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telemetry stand-in stream")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--port", type=int, default=9000)
+    p_serve.add_argument("--hz", type=float, default=50)
+    p_sim = sub.add_parser("simulate")
+    p_sim.add_argument("--out", default="telemetry.jsonl")
+    p_sim.add_argument("--hz", type=float, default=50)
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        asyncio.run(_serve(args.port, args.hz))
+    else:
+        with open(args.out, "a", encoding="utf-8") as f:
+            while True:
+                f.write(json.dumps(simulated_sample(time.time())) + "\n")
+                f.flush()
+                time.sleep(1 / args.hz)
@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+import api
+import cache
+from plant_model import PRICES
+
+
+@pytest.fixture(autouse=True)
+def no_shared_cache(monkeypatch):
+    monkeypatch.setattr(cache, "_backend", cache.NullCache())
+
+
+def run_with_batcher(coro_func, **batcher_kwargs):
+    """Run coro_func(server) against an APIServer whose micro-batcher is running."""
+    async def main():
+        server = api.APIServer(**batcher_kwargs)
+        server.batcher = api.MicroBatcher(server.table, *server.batcher_args)
+        task = asyncio.create_task(server.batcher.run())
+        try:
+            return await coro_func(server)
+        finally:
+            task.cancel()
+    return asyncio.run(main())
+
+
+def test_api_and_app_share_performance_cache_keys():
+    assert cache.performance_key(1000, 20, 0.75, 90, 24, PRICES, 850) == \
+        cache.make_key("calculate_performance", 1000, 20, 0.75, 90, 24, PRICES, 850)
+    # The API normalizes integral JSON numbers to int, as the UI sliders produce them
+    item = api.parse_item({"feed_rate": 1000.0, "moisture": 20, "unit_multiplier": 24})
+    assert cache.performance_key(item["feed_rate"], item["moisture"], item["cge"], item["co2_capture"],
+                                 item["unit_multiplier"], PRICES, item["temperature"]) == \
+        cache.make_key("calculate_performance", 1000, 20, 0.75, 90, 24, PRICES, 850)
+
+
+def test_parse_item_fills_defaults():
+    assert api.parse_item({"feed_rate": 1000, "moisture": 20.5}) == {
+        "feed_rate": 1000, "moisture": 20.5, "cge": 0.75, "co2_capture": 90, "temperature": 850, "unit_multiplier": 1,
+    }
+
+
+@pytest.mark.parametrize("obj, message", [
+    ([1000, 20], "must be a JSON object"),
+    ({"moisture": 20}, "missing field 'feed_rate'"),
+    ({"feed_rate": "1000", "moisture": 20}, "feed_rate: expected a number"),
+    ({"feed_rate": True, "moisture": 20}, "feed_rate: expected a number"),
+    ({"feed_rate": float("nan"), "moisture": 20}, "feed_rate: expected a finite number"),
+    ({"feed_rate": -5, "moisture": 20}, "feed_rate must be >= 0, got -5"),
+    ({"feed_rate": 1000, "moisture": 101}, "moisture must be >= 0 and <= 100"),
+    ({"feed_rate": 1000, "moisture": 20, "cge": 0}, "cge must be > 0 and <= 1"),
+    ({"feed_rate": 1000, "moisture": 20, "unit_multiplier": 0}, "unit_multiplier must be > 0"),
+])
+def test_parse_item_rejects_out_of_range_input(obj, message):
+    with pytest.raises(api.BadRequest, match=message):
+        api.parse_item(obj)
+
+
+def test_single_and_items_bodies():
+    async def calls(server):
+        single = await server._route("POST", "/v1/performance", b'{"feed_rate": 1000, "moisture": 20}')
+        batch = await server._route("POST", "/v1/performance", json.dumps({"items": [
+            {"feed_rate": 1000, "moisture": 20}, {"feed_rate": 2000, "moisture": 30}]}).encode())
+        empty = await server._route("POST", "/v1/performance", b'{"items": []}')
+        bad = await server._route("POST", "/v1/performance", b'{"items": [{"feed_rate": 1000}]}')
+        return single, batch, empty, bad
+
+    single, batch, empty, bad = run_with_batcher(calls)
+    assert single[0] == 200 and set(single[1]) == {"result"}
+    assert batch[0] == 200 and len(batch[1]["results"]) == 2
+    assert batch[1]["results"][0] == single[1]["result"]
+    assert batch[1]["results"][1]["h2_output"] > single[1]["result"]["h2_output"]
+    assert empty == (400, {"error": "'items' must be a non-empty list"})
+    assert bad == (400, {"error": "missing field 'moisture'"})
+
+
+def test_micro_batcher_isolates_a_failing_job():
+    async def calls(server):
+        evaluate = server.batcher._evaluate
+
+        def poisoned(items):
+            if any(item["feed_rate"] == 666 for item in items):
+                raise RuntimeError("poisoned item")
+            return evaluate(items)
+
+        server.batcher._evaluate = poisoned
+        jobs = [[api.parse_item({"feed_rate": f, "moisture": 20})] for f in (1000, 666, 2000)]
+        return server.batcher, await asyncio.gather(*(server.batcher.submit(j) for j in jobs), return_exceptions=True)
+
+    # A generous max_wait so the three submissions land in one batch
+    batcher, (ok1, failed, ok2) = run_with_batcher(calls, max_wait=0.05)
+    assert isinstance(failed, RuntimeError)
+    assert len(ok1) == 1 and len(ok2) == 1
+    assert ok2[0]["h2_output"] > ok1[0]["h2_output"]
+    assert batcher.computed == 2
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import cache
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return cache.DiskCache(str(tmp_path / "cache"), max_bytes=64 * 1024, background=False)
+
+
+def test_make_key_depends_on_arguments():
+    assert cache.make_key("ns", 1, 2) == cache.make_key("ns", 1, 2)
+    assert cache.make_key("ns", 1, 2) != cache.make_key("ns", 2, 1)
+    assert cache.make_key("ns", 1, prices={"h2": 5}) != cache.make_key("ns", 1, prices={"h2": 6})
+
+
+def test_disk_cache_round_trip_and_max_age(disk):
+    disk.set_json("k" * 64, {"a": 1})
+    assert disk.get_json("k" * 64) == {"a": 1}
+    assert disk.get_bytes("f" * 64) is None
+    time.sleep(0.02)
+    assert disk.get_bytes("k" * 64, max_age=0.01) is None
+    assert disk.stats.expirations == 1
+
+
+def test_disk_cache_counts_allocated_blocks(disk):
+    for i in range(5):
+        disk.set_bytes(cache.make_key("n", i), b"x" * 10)
+    # Tiny entries still take at least one filesystem block each
+    assert disk.info()["resident_bytes"] >= 5 * min(disk._block, 512)
+    rescanned = cache.DiskCache(disk.directory, disk.max_bytes, background=False)
+    entries, total = rescanned._scan()
+    assert len(entries) == 5
+    assert total == rescanned.info()["resident_bytes"]
+    assert all(size >= 512 for _, size, _ in entries)
+
+
+def test_disk_cache_evicts_oldest_first(disk):
+    disk.max_bytes = 1 << 30
+    keys = [f"aa{i:062x}" for i in range(40)]  # one subdirectory, so entries dominate the size
+    for i, key in enumerate(keys):
+        disk.set_bytes(key, b"x" * 2000)
+        os.utime(disk._path(key), (1000 + i, 1000 + i))
+    disk.max_bytes = disk._scan()[1] // 2
+    disk.evict()
+    assert disk._approx_bytes <= disk.max_bytes * 0.9
+    assert disk._approx_bytes == disk._scan()[1]
+    assert disk.get_bytes(keys[0]) is None
+    assert disk.get_bytes(keys[-1]) is not None
+
+
+def test_disk_cache_maintenance_runs_off_the_calling_thread(tmp_path, monkeypatch):
+    ran = {}
+    done = threading.Event()
+
+    def record(name):
+        def task(self, *args):
+            ran[name] = threading.current_thread()
+            done.set()
+        return task
+
+    monkeypatch.setattr(cache.DiskCache, "_refresh", record("refresh"))
+    monkeypatch.setattr(cache.DiskCache, "evict", record("evict"))
+    c = cache.DiskCache(str(tmp_path / "bg"), max_bytes=1024)
+    assert done.wait(5)
+    assert ran["refresh"] is not threading.current_thread()
+
+    # Going over budget schedules eviction the same way
+    done.clear()
+    deadline = time.time() + 5
+    while c._maintenance.locked() and time.time() < deadline:
+        time.sleep(0.01)
+    c.set_bytes("e" * 64, b"x" * 4096)
+    assert done.wait(5)
+    assert ran["evict"] is not threading.current_thread()
+
+
+def test_memoize_shares_results_through_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "_backend", cache.DiskCache(str(tmp_path / "shared"), background=False))
+    calls = []
+
+    @cache.memoize("test_memoize_shared")
+    def square(x):
+        calls.append(x)
+        return {"y": x * x}
+
+    assert square(3) == {"y": 9}
+    assert square(3) == {"y": 9}
+    assert calls == [3]
+    # A second process (fresh memory tier) is served from disk
+    cache._memory_caches["test_memoize_shared"].clear()
+    assert square(3) == {"y": 9}
+    assert calls == [3]
+    stored = cache.get_backend().get_bytes(cache.make_key("test_memoize_shared", 3))
+    assert json.loads(stored) == {"y": 9}
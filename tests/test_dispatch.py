@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+scipy_optimize = pytest.importorskip("scipy.optimize")
+
+import dispatch
+
+
+def lp_revenue(production, prices, storage, charge, discharge, compression_cost, initial=0.0):
+    """Exact optimum of the same problem as an LP: variables are hourly charge c_t and discharge d_t."""
+    hours = len(prices)
+    lower = np.tril(np.ones((hours, hours)))  # level_t = initial + cumsum(c - d)
+    cost = np.concatenate([prices + compression_cost, -prices])  # minimise -(revenue - instant sale)
+    a_ub = np.block([[lower, -lower], [-lower, lower]])
+    b_ub = np.concatenate([np.full(hours, storage - initial), np.full(hours, initial)])
+    bounds = [(0, min(charge, p)) for p in production] + [(0, discharge)] * hours
+    res = scipy_optimize.linprog(cost, A_ub=a_ub, b_ub=b_ub, bounds=bounds, method="highs")
+    assert res.status == 0
+    return float(production @ prices - res.fun)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_schedule_matches_lp_optimum(seed):
+    rng = np.random.default_rng(seed)
+    hours = 24 * 14
+    prices = dispatch.synthetic_price_curve(5.0, hours=hours, volatility=0.3, seed=seed)
+    production = rng.uniform(40, 80, hours)
+    storage, charge, discharge, comp = rng.uniform(200, 1500), rng.uniform(10, 60), rng.uniform(20, 120), 0.1
+
+    result = dispatch.schedule(production, prices, storage, charge, discharge, comp)
+    exact = lp_revenue(production, prices, storage, charge, discharge, comp)
+    exact_uplift = exact - production @ prices
+
+    assert exact_uplift > 0
+    assert result["revenue"][0] <= exact + 1e-6 * exact  # the schedule is feasible, so never beats the LP
+    assert result["uplift"][0] >= exact_uplift * (1 - 0.005)
+
+
+def test_schedule_respects_limits():
+    rng = np.random.default_rng(7)
+    hours = 24 * 7
+    production = rng.uniform(0, 100, (3, hours))
+    prices = dispatch.synthetic_price_curve(5.0, hours=hours, seed=1)
+    storage, charge, discharge = np.array([0.0, 300.0, 1000.0]), 40.0, np.array([10.0, 50.0, 200.0])
+    r = dispatch.schedule(production, prices, storage, charge, discharge, 0.2)
+
+    assert np.all(r["level"] >= -1e-9) and np.all(r["level"] <= storage[:, None] + 1e-9)
+    assert np.all(r["charge"] <= np.minimum(charge, production) + 1e-9)
+    assert np.all(r["discharge"] <= discharge[:, None] + 1e-9)
+    np.testing.assert_allclose(r["sold"], production - r["charge"] + r["discharge"])
+    np.testing.assert_allclose(r["level"][:, -1], (r["charge"] - r["discharge"]).sum(axis=1), atol=1e-6)
+    assert r["uplift"][0] == pytest.approx(0.0)  # no storage: nothing to shift
+
+
+def test_initial_stock_is_not_counted_as_uplift():
+    hours = 24 * 7
+    prices = dispatch.synthetic_price_curve(5.0, hours=hours, seed=3)
+    production = np.full(hours, 50.0)
+    args = (production, prices, 1000.0, 30.0, 100.0, 0.1)
+    empty = dispatch.schedule(*args)
+    stocked = dispatch.schedule(*args, initial_kg=800.0)
+
+    # Selling the initial 800 kg at the discharge limit from hour 0 is in the baseline
+    drained = np.clip(800.0 - 100.0 * np.arange(hours), 0, 100.0)
+    assert stocked["instant_revenue"][0] == pytest.approx(production @ prices + drained @ prices)
+    # ...so the uplift is only what timing the sales adds, as the LP with the same start sees it
+    exact_uplift = lp_revenue(production, prices, 1000.0, 30.0, 100.0, 0.1, initial=800.0) - stocked["instant_revenue"][0]
+    assert 0 <= stocked["uplift"][0] <= exact_uplift + 1e-6
+    assert stocked["uplift"][0] >= exact_uplift * (1 - 0.005)
+    assert stocked["uplift"][0] < empty["uplift"][0] + 800.0 * (prices.max() - prices.min())
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hour,price\n0,4.5\n1,-0.25\n", [4.5, -0.25]),
+    ("2024-01-01T00:00,1e-3\n2024-01-01T01:00,5\n\n", [1e-3, 5.0]),  # no header, scientific notation
+    ("price\n.5\n", [0.5]),
+])
+def test_load_prices_detects_header(tmp_path, text, expected):
+    path = tmp_path / "prices.csv"
+    path.write_text(text)
+    np.testing.assert_array_equal(dispatch._load_prices(str(path)), expected)
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pytest
+
+import history
+
+
+@pytest.fixture
+def store(tmp_path):
+    return history.HistoryStore(str(tmp_path / "h.sqlite"))
+
+
+def naive_fold(ts, columns):
+    """Per-sample reference for record_many: {(res, bucket, kpi): [n, sum, min, max]}."""
+    out = {}
+    for kpi, values in columns.items():
+        for t, v in zip(ts, values):
+            if math.isnan(v):
+                continue
+            for res, width in history.RESOLUTIONS.items():
+                cell = out.setdefault((res, int(t // width) * width, kpi), [0, 0.0, math.inf, -math.inf])
+                cell[0] += 1
+                cell[1] += v
+                cell[2] = min(cell[2], v)
+                cell[3] = max(cell[3], v)
+    return out
+
+
+def stored(store):
+    rows = {}
+    for res in history.RESOLUTIONS:
+        for bucket, kpi, n, s, lo, hi in store._conn().execute(f"SELECT bucket, kpi, n, sum, min, max FROM rollup_{res}"):
+            rows[(res, bucket, kpi)] = [n, s, lo, hi]
+    return rows
+
+
+def test_record_many_matches_per_sample_fold(store):
+    rng = np.random.default_rng(1)
+    ts = rng.uniform(0, 3 * 86400, 2000)  # unsorted, spans several days
+    a = rng.normal(10, 3, len(ts))
+    b = rng.normal(-5, 1, len(ts))
+    b[::7] = np.nan
+    # Two batches so the second one exercises the upsert merge
+    store.record_many(ts[:1200], {"a": a[:1200], "b": b[:1200]})
+    store.record_many(ts[1200:], {"a": a[1200:], "b": b[1200:]})
+
+    expected = naive_fold(ts, {"a": a, "b": b})
+    got = stored(store)
+    assert got.keys() == expected.keys()
+    for key, (n, s, lo, hi) in expected.items():
+        assert got[key][0] == n
+        assert got[key][1] == pytest.approx(s)
+        assert got[key][2:] == [lo, hi]
+
+
+def test_record_skips_nan_only_kpis(store):
+    store.record(120.0, {"a": 1.0, "b": float("nan")})
+    assert store.kpis() == ["a"]
+
+
+@pytest.mark.parametrize("hours, max_points, res", [
+    (6, 500, "1m"),        # 360 minute buckets
+    (24, 500, "1h"),       # 1440 minute buckets is too many, 24 hourly fit
+    (24 * 20, 500, "1h"),  # 480 hourly buckets
+    (24 * 30, 100, "1d"),
+    (24 * 365 * 5, 500, "1d"),  # nothing fits: coarsest
+])
+def test_pick_resolution(hours, max_points, res):
+    assert history.HistoryStore.pick_resolution(0, hours * 3600, max_points) == res
+
+
+def test_query_reads_the_picked_rollup_and_window(store):
+    day = 86400
+    ts = np.arange(0, 10 * day, 600.0)
+    store.record_many(ts, {"a": ts / day})
+
+    # 3 days at 500 points -> hourly; the start is aligned down to its bucket, the end is exclusive
+    start, end = 2 * day + 1800, 5 * day
+    series = store.query("a", start, end, max_points=500)
+    assert series["resolution"] == "1h"
+    assert series["ts"][0] == 2 * day and series["ts"][-1] == end - 3600
+    assert len(series["ts"]) == 3 * 24
+    i = series["ts"].index(3 * day)
+    assert series["min"][i] == 3.0
+    assert series["max"][i] == pytest.approx((3 * day + 3000) / day)
+    assert series["mean"][i] == pytest.approx((3 * day + 1500) / day)
+
+    series = store.query("a", 0, 10 * day, max_points=20)
+    assert series["resolution"] == "1d"
+    assert series["ts"] == [d * day for d in range(10)]
+    assert store.query("missing", 0, 10 * day)["ts"] == []
+
+
+def test_open_store_returns_none_when_unwritable(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    assert history.open_store(str(blocker / "h.sqlite")) is None
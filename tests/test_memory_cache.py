@@ -0,0 +1,26 @@
+import time
+
+import cache
+
+
+def test_memory_cache_evicts_least_recently_used():
+    mem = cache.MemoryCache(max_entries=2, max_bytes=1000)
+    mem.set("a", 1, 10)
+    mem.set("b", 2, 10)
+    assert mem.get("a") == 1  # "b" is now the oldest
+    mem.set("c", 3, 10)
+    assert mem.get("b") is None
+    assert mem.get("a") == 1 and mem.get("c") == 3
+    assert mem.stats.evictions == 1
+
+
+def test_memory_cache_byte_budget_and_ttl():
+    mem = cache.MemoryCache(max_entries=100, max_bytes=100, ttl=0.05)
+    mem.set("big", "x", 101)
+    assert mem.get("big") is None  # larger than the whole budget: never stored
+    for i in range(5):
+        mem.set(str(i), i, 30)
+    assert mem.resident_bytes <= 100
+    time.sleep(0.06)
+    assert mem.get("4") is None
+    assert mem.stats.expirations == 1
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import telemetry
+
+
+def block(start, n, channels=2):
+    ts = np.arange(start, start + n, dtype=np.float64)
+    return ts, np.column_stack([ts * (c + 1) for c in range(channels)])
+
+
+def test_ring_buffer_keeps_order_before_wrapping():
+    buf = telemetry.RingBuffer(10, channels=("a", "b"))
+    buf.extend(*block(0, 4))
+    buf.extend(*block(4, 3))
+    ts, values = buf.snapshot()
+    assert len(buf) == 7
+    np.testing.assert_array_equal(ts, np.arange(7))
+    np.testing.assert_array_equal(buf.column(values, "b"), 2 * np.arange(7))
+
+
+def test_ring_buffer_overwrites_oldest_across_the_seam():
+    buf = telemetry.RingBuffer(10, channels=("a", "b"))
+    for start in range(0, 27, 3):  # blocks that straddle the end of the array
+        buf.extend(*block(start, 3))
+    ts, values = buf.snapshot()
+    assert len(buf) == 10
+    np.testing.assert_array_equal(ts, np.arange(17, 27))
+    np.testing.assert_array_equal(buf.column(values, "a"), np.arange(17, 27))
+
+
+def test_ring_buffer_block_larger_than_capacity():
+    buf = telemetry.RingBuffer(5, channels=("a", "b"))
+    buf.extend(*block(0, 2))
+    buf.extend(*block(2, 12))
+    ts, _ = buf.snapshot()
+    np.testing.assert_array_equal(ts, np.arange(9, 14))
+
+
+def test_ring_buffer_snapshot_since():
+    buf = telemetry.RingBuffer(8, channels=("a", "b"))
+    buf.extend(*block(0, 12))
+    ts, values = buf.snapshot(since=9.5)
+    np.testing.assert_array_equal(ts, [10, 11])
+    assert values.shape == (2, 2)
+    assert buf.snapshot(since=100)[0].size == 0
+
+
+def test_ring_buffer_snapshots_are_consistent_under_concurrent_writes():
+    buf = telemetry.RingBuffer(1000, channels=("a", "b"))
+    stop = threading.Event()
+
+    def writer():
+        start = 0
+        while not stop.is_set():
+            buf.extend(*block(start, 37))
+            start += 37
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(200):
+            ts, values = buf.snapshot()
+            # Chronological, no gaps, and every row belongs to its timestamp
+            assert np.all(np.diff(ts) == 1)
+            np.testing.assert_array_equal(values[:, 1], 2 * ts)
+    finally:
+        stop.set()
+        thread.join()
+
+
+@pytest.mark.parametrize("downsample", [telemetry.downsample_minmax, telemetry.downsample_lttb])
+def test_downsampling_keeps_extremes_and_endpoints(downsample):
+    ts = np.arange(10_000, dtype=np.float64)
+    ys = np.sin(ts / 500)
+    ys[4321] = 5.0  # a spike must survive
+    out_t, out_y = downsample(ts, ys, 200)
+    assert len(out_t) <= 400
+    assert np.all(np.diff(out_t) > 0)
+    assert 5.0 in out_y
+    if downsample is telemetry.downsample_lttb:
+        assert out_t[0] == 0 and out_t[-1] == ts[-1]
+
+
+def test_downsampling_short_series_is_unchanged():
+    ts, ys = np.arange(10.0), np.arange(10.0)
+    for downsample in (telemetry.downsample_minmax, telemetry.downsample_lttb):
+        out_t, out_y = downsample(ts, ys, 50)
+        np.testing.assert_array_equal(out_t, ts)
+
+
+def test_downsample_minmax_skips_all_nan_buckets():
+    ts = np.arange(1000, dtype=np.float64)
+    ys = np.cos(ts / 50)
+    ys[200:600] = np.nan  # channel missing for whole buckets, partly for the ones at the edges
+    ys[650] = -3.0
+    out_t, out_y = telemetry.downsample_minmax(ts, ys, 50)
+    assert not np.isnan(out_y).any()
+    assert not ((out_t >= 200) & (out_t < 600)).any()
+    assert -3.0 in out_y
+    out_t, out_y = telemetry.downsample_minmax(ts, np.full(1000, np.nan), 50)
+    assert out_t.size == 0 and out_y.size == 0
+
+
+def test_service_drops_out_of_order_samples():
+    service = telemetry.TelemetryService("unused", capacity=100)
+
+    async def lines():
+        for t in (1.0, 2.0, 1.5, 3.0, float("nan"), 3.0, 2.9, 4.0):
+            yield json.dumps({"ts": t, "feed_rate": t}).encode()
+        yield b"not json"
+
+    asyncio.run(service._consume(lines()))
+    ts, values = service.buffer.snapshot()
+    np.testing.assert_array_equal(ts, [1.0, 2.0, 3.0, 3.0, 4.0])
+    np.testing.assert_array_equal(service.buffer.column(values, "feed_rate"), ts)
+    assert service.received == 5 and service.dropped == 4
+    np.testing.assert_array_equal(service.buffer.snapshot(since=2.5)[0], [3.0, 3.0, 4.0])
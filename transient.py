@@ -0,0 +1,220 @@
+"""Transient process-train model for auto-play: cold start, warm-up and step responses.
+
+One ODE state group per CINEMATIC_STAGES entry (time in hours):
+    0 intake        F   feed delivered by the conveyor, lags the permitted feed
+    1 drying        Td  dryer temperature (waste-heat loop warms up)
+                    D   dry solids leaving the dryer, Wr residual water leaving the dryer
+    2 gasification  Tg  gasifier temperature, PI-controlled heat input I (integral state);
+                        wet feed cools it, feed is only permitted as it nears the setpoint.
+                        The heater is sized per scenario from its worst load (wall losses at
+                        the setpoint plus the wettest, largest feed among the steps), so the
+                        setpoint is reachable anywhere in the sidebar ranges
+                    G   converted dry feed (kg/h dry x CGE)
+    3 cleanup/WGS   H   H₂ leaving shift and separation
+    4 synthesis     M   methanol, S SAF (Fischer-Tropsch is the slowest loop)
+    5 dispatch      Q   cumulative H₂ dispatched, R cumulative net revenue
+At steady state with the gasifier at its setpoint the flows equal
+plant_model.compute_performance per hour. A run whose last step returns to
+the dashboard's inputs a few hours before the end (the app's playback
+leaves 4 h) therefore finishes on the dashboard's KPIs, SAF within ~0.2%.
+
+Every array has a leading scenario axis and the integrator is fixed-step
+RK4, so one run advances any number of scenarios together. simulate()
+yields the trajectory in chunks of frames, and Playback hands them to the
+stage panel one chunk per stage as auto-play reaches it.
+
+    python transient.py run --scenarios 1000 --hours 12
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from plant_model import DEFAULT_YIELDS, PRICES
+
+STATES = ("F", "Td", "D", "Wr", "Tg", "I", "G", "H", "M", "S", "Q", "R")
+_IDX = {name: i for i, name in enumerate(STATES)}
+
+AMBIENT_C = 25.0
+DRYER_SETPOINT_C = 150.0
+DRYER_MAX_REMOVAL = 0.6  # fraction of the feed water the dryer removes once warm
+
+# Time constants (h)
+TAU = {"feed": 0.05, "dryer_heat": 0.5, "dryer": 0.25, "gasifier": 0.1, "wgs": 0.2, "meoh": 0.5, "ft": 1.0}
+
+# Gasifier energy balance in °C/h: heat input (PI-controlled, saturating) against wall losses
+# and evaporating the residual water. The heater saturates at heat_margin x the steady load of the
+# worst step, which also sets how fast a cold gasifier warms up (~1.4 h at the sidebar defaults).
+GASIFIER = {"loss_per_c": 0.5, "evap_per_kg_h": 0.4, "heat_margin": 2.0, "kp": 5.0, "ki": 10.0}
+
+# Playback variables per stage id: (frame key, label, unit)
+STAGE_VARIABLES = {
+    0: (("feed", "Feed Delivered", "kg/hr"), ("ready", "Feed Permit", "%")),
+    1: (("dryer_temp", "Dryer Temp", "°C"), ("dry_solids", "Dry Solids", "kg/hr"), ("residual_water", "Residual Water", "kg/hr")),
+    2: (("gasifier_temp", "Gasifier Temp", "°C"), ("converted", "Converted Feed", "kg/hr"), ("ready", "Warm-up", "%")),
+    3: (("h2", "H₂ Flow", "kg/hr"), ("co2", "CO₂ Captured", "kg/hr")),
+    4: (("meoh", "Methanol", "kg/hr"), ("saf", "SAF", "kg/hr")),
+    5: (("h2_dispatched", "H₂ Dispatched", "kg"), ("revenue", "Net Revenue", "$")),
+}
+
+
+def _smoothstep(x, lo, hi):
+    x = np.clip((x - lo) / (hi - lo), 0.0, 1.0)
+    return x * x * (3 - 2 * x)
+
+
+def _step_values(times, values, t):
+    # Piecewise-constant inputs: value of the last step at or before t, per scenario
+    idx = np.maximum((times <= t).sum(axis=1) - 1, 0)
+    return values[np.arange(len(values)), idx]
+
+
+class _Model:
+    def __init__(self, steps_t, steps_feed, steps_moisture, temperature, cge, co2_capture, prices):
+        self.steps_t, self.steps_feed, self.steps_moisture = steps_t, steps_feed, steps_moisture
+        self.t_set, self.cge, self.capture = temperature, cge, co2_capture / 100
+        self.prices = prices
+        g = GASIFIER
+        residual_water = (steps_feed * steps_moisture / 100).max(axis=1) * (1 - DRYER_MAX_REMOVAL)
+        self.heat_max = g["heat_margin"] * (g["loss_per_c"] * (temperature - AMBIENT_C) + g["evap_per_kg_h"] * residual_water)
+
+    def ready(self, tg):
+        # Gasifier availability: 0 when cold, 1 from ~97% of the way to the setpoint
+        return _smoothstep((tg - AMBIENT_C) / (self.t_set - AMBIENT_C), 0.85, 0.97)
+
+    def heat(self, tg, integral):
+        g = GASIFIER
+        return np.clip(g["kp"] * (self.t_set - tg) + g["ki"] * integral, 0.0, self.heat_max)
+
+    def rhs(self, t, x):
+        F, Td, D, Wr, Tg, I, G, H, M, S = (x[:, _IDX[n]] for n in STATES[:10])
+        feed_set = _step_values(self.steps_t, self.steps_feed, t)
+        moisture = _step_values(self.steps_t, self.steps_moisture, t) / 100
+        ready = self.ready(Tg)
+        removal = DRYER_MAX_REMOVAL * np.clip((Td - AMBIENT_C) / (DRYER_SETPOINT_C - AMBIENT_C), 0.0, 1.0)
+        g = GASIFIER
+        error = self.t_set - Tg
+        heat = self.heat(Tg, I)
+        # Anti-windup: stop integrating while the heater is saturated in the direction of the error
+        windup = ((heat >= self.heat_max) & (error > 0)) | ((heat <= 0) & (error < 0))
+        p = self.prices
+        # Same revenue/opex/tax terms as compute_performance, on the instantaneous flows
+        pre_tax = (H * p["h2"] + M * p["meoh"] + S * p["saf"] + H * 8.8 * self.capture / 1000 * p["co2"]
+                   - D * p["opex_per_kg_dry"])
+
+        dx = np.empty_like(x)
+        dx[:, _IDX["F"]] = (feed_set * ready - F) / TAU["feed"]
+        dx[:, _IDX["Td"]] = (AMBIENT_C + (DRYER_SETPOINT_C - AMBIENT_C) * (F > 0) - Td) / TAU["dryer_heat"]
+        dx[:, _IDX["D"]] = (F * (1 - moisture) - D) / TAU["dryer"]
+        dx[:, _IDX["Wr"]] = (F * moisture * (1 - removal) - Wr) / TAU["dryer"]
+        dx[:, _IDX["Tg"]] = heat - g["loss_per_c"] * (Tg - AMBIENT_C) - g["evap_per_kg_h"] * Wr
+        dx[:, _IDX["I"]] = np.where(windup, 0.0, error)
+        dx[:, _IDX["G"]] = (self.cge * ready * D - G) / TAU["gasifier"]
+        dx[:, _IDX["H"]] = (DEFAULT_YIELDS["h2"] * G - H) / TAU["wgs"]
+        dx[:, _IDX["M"]] = (DEFAULT_YIELDS["meoh"] * G - M) / TAU["meoh"]
+        dx[:, _IDX["S"]] = (DEFAULT_YIELDS["saf"] * G - S) / TAU["ft"]
+        dx[:, _IDX["Q"]] = H
+        dx[:, _IDX["R"]] = pre_tax - np.maximum(pre_tax * 0.20, 0)
+        return dx
+
+    def frame(self, x):
+        col = lambda n: x[:, _IDX[n]]
+        return {
+            "feed": col("F"), "ready": 100 * self.ready(col("Tg")),
+            "dryer_temp": col("Td"), "dry_solids": col("D"), "residual_water": col("Wr"),
+            "gasifier_temp": col("Tg"), "converted": col("G"),
+            "h2": col("H"), "co2": col("H") * 8.8 * self.capture,
+            "meoh": col("M"), "saf": col("S"),
+            "h2_dispatched": col("Q"), "revenue": col("R"),
+        }
+
+
+def simulate(feed_rate, moisture, temperature=850.0, cge=0.75, co2_capture=90.0, steps=(), hours=12.0,
+             dt_s=30.0, frame_s=120.0, chunk_frames=60, prices=PRICES):
+    """Integrate a cold start, yielding chunks {"t": (n,) h, <frame key>: (scenarios, n)}.
+
+    feed_rate, moisture, temperature, cge, co2_capture: scalars or (scenarios,) arrays (initial inputs).
+    steps: [(t_hours, feed_rate, moisture), ...] step changes applied to every scenario; the values
+    may be scalars or (scenarios,) arrays.
+    """
+    base = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=np.float64))
+                                 for v in (feed_rate, moisture, temperature, cge, co2_capture)))
+    n = len(base[0])
+    steps = [(0.0, base[0], base[1])] + sorted(steps, key=lambda s: s[0])
+    steps_t = np.tile(np.array([s[0] for s in steps], dtype=np.float64), (n, 1))
+    steps_feed = np.stack([np.broadcast_to(np.asarray(s[1], dtype=np.float64), (n,)) for s in steps], axis=1)
+    steps_moisture = np.stack([np.broadcast_to(np.asarray(s[2], dtype=np.float64), (n,)) for s in steps], axis=1)
+    model = _Model(steps_t, steps_feed, steps_moisture, base[2], base[3], base[4], prices)
+
+    x = np.zeros((n, len(STATES)))
+    x[:, _IDX["Td"]] = x[:, _IDX["Tg"]] = AMBIENT_C
+    dt = dt_s / 3600
+    steps_per_frame = max(1, int(round(frame_s / dt_s)))
+    n_frames = int(round(hours * 3600 / frame_s)) + 1
+    t = 0.0
+    for start in range(0, n_frames, chunk_frames):
+        count = min(chunk_frames, n_frames - start)
+        times = np.empty(count)
+        frames = []
+        for i in range(count):
+            if start + i > 0:
+                for _ in range(steps_per_frame):
+                    k1 = model.rhs(t, x)
+                    k2 = model.rhs(t + dt / 2, x + dt / 2 * k1)
+                    k3 = model.rhs(t + dt / 2, x + dt / 2 * k2)
+                    k4 = model.rhs(t + dt, x + dt * k3)
+                    x = x + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+                    t += dt
+            times[i] = t
+            frames.append(model.frame(x))
+        yield {"t": times, **{key: np.stack([f[key] for f in frames], axis=1) for key in frames[0]}}
+
+
+class Playback:
+    """Chunks of one scenario's trajectory, computed on first request and kept for replay."""
+
+    def __init__(self, n_chunks: int, **simulate_kwargs):
+        self.n_chunks = n_chunks
+        self._chunks = []
+        self._lock = threading.Lock()
+        # One chunk per stage: spread the frames of the whole run evenly
+        hours = simulate_kwargs.get("hours", 12.0)
+        frame_s = simulate_kwargs.get("frame_s", 120.0)
+        simulate_kwargs["chunk_frames"] = -(-(int(round(hours * 3600 / frame_s)) + 1) // n_chunks)
+        self._source = simulate(**simulate_kwargs)
+
+    def chunk(self, i: int) -> dict:
+        """Frames of chunk i as lists ({"t": [...], <frame key>: [...]}), for one scenario."""
+        with self._lock:
+            while len(self._chunks) <= i:
+                c = next(self._source, None)
+                if c is None:
+                    break
+                self._chunks.append({k: (v if k == "t" else v[0]).tolist() for k, v in c.items()})
+            return self._chunks[min(i, len(self._chunks) - 1)]
+
+    def all_chunks(self) -> list:
+        return [self.chunk(i) for i in range(self.n_chunks)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transient process-train simulation")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="cold start plus step changes for many random scenarios")
+    r.add_argument("--scenarios", type=int, default=1000)
+    r.add_argument("--hours", type=float, default=12.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    feed = rng.uniform(500, 5000, args.scenarios)
+    moist = rng.uniform(5, 40, args.scenarios)
+    t0 = time.perf_counter()
+    last = None
+    for last in simulate(feed, moist, rng.uniform(750, 950, args.scenarios), rng.uniform(0.5, 0.9, args.scenarios),
+                         steps=[(args.hours / 2, feed, moist + 10), (args.hours * 0.75, feed * 1.2, moist + 10)],
+                         hours=args.hours):
+        pass
+    elapsed = time.perf_counter() - t0
+    print(f"{args.scenarios} scenarios x {args.hours} h in {elapsed:.2f} s; "
+          f"final H2 mean {last['h2'][:, -1].mean():.1f} kg/hr, gasifier {last['gasifier_temp'][:, -1].mean():.0f} °C")